@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Traitement par lot commun à img2svg.py et svg2stl.py :
+applique une fonction (path, params) à chaque fichier, en série ou sur un
+pool de processus (--jobs N). Chaque fichier est isolé : une exception est
+rapportée avec son statut et son temps sans arrêter le lot.
+"""
+
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from pathlib import Path
+import tracing
+
+
+class StageTimer:
+    """Chronomètre par étape : lap(stage) cumule le temps écoulé depuis le lap précédent."""
+
+    def __init__(self):
+        self.timings = {}
+        self._last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + now - self._last
+        self._last = now
+
+
+def timings_of(result):
+    """Temps par étape d'un résultat : le dict lui-même ou son attribut timings."""
+    result = getattr(result, "timings", result)
+    return result if isinstance(result, dict) else None
+
+
+def describe(result):
+    """Message court pour un résultat : chemin, ou temps par étape (dict)."""
+    if timings_of(result) is not None:
+        result = timings_of(result)
+        return " ".join(f"{stage}={seconds:.2f}s" for stage, seconds in result.items())
+    return "" if result is None else str(result)
+
+
+def run_one(func, path, params, trace=False, profile_dir=None):
+    """
+    Exécute func(path, params) et renvoie un rapport (jamais d'exception).
+    Avec trace, le rapport contient aussi l'enregistrement tracing (étapes,
+    compteurs) sous "trace" ; avec profile_dir, un profil cProfile par fichier.
+    """
+    start = time.perf_counter()
+    profile_path = profile_dir and Path(profile_dir) / f"{path.stem}.prof"
+    with tracing.traced(path.name, profile_path) if trace or profile_path else nullcontext() as active:
+        try:
+            result = func(path, params)
+            status, message = "ok", describe(result)
+        except Exception as e:
+            result = None
+            status, message = "error", f"{type(e).__name__}: {e}"
+    report = {
+        "name": path.name,
+        "status": status,
+        "message": message,
+        "result": result,
+        "seconds": time.perf_counter() - start,
+    }
+    if active is not None:
+        trace = active.record()
+        trace["stages"] = {**(timings_of(result) or {}), **trace["stages"]}
+        report["trace"] = {**trace, "status": status, "seconds": report["seconds"]}
+    return report
+
+
+def print_report(report):
+    icon = "✅" if report["status"] == "ok" else "❌"
+    print(f"{icon} {report['name']} ({report['seconds']:.2f} s) {report['message']}", flush=True)
+
+
+def run_batch(func, paths, params, jobs=1, cache=None, output_for=None, trace_path=None, profile_dir=None):
+    """
+    Traite tous les fichiers, renvoie les rapports dans l'ordre d'entrée.
+    Avec un BuildCache (et output_for(path) -> fichier de sortie), les
+    fichiers déjà construits avec ces paramètres sont sautés (statut
+    "cached") et les succès sont enregistrés dans le manifeste.
+    trace_path : une ligne JSON par fichier traité (voir tracing) ;
+    profile_dir : un profil cProfile par fichier.
+    """
+    paths = list(paths)
+    reports = [None] * len(paths)
+    todo = list(range(len(paths)))
+    if cache is not None:
+        todo = []
+        for i, path in enumerate(paths):
+            if cache.is_fresh(path, params, output_for(path)):
+                reports[i] = {"name": path.name, "status": "cached", "message": "", "result": None, "seconds": 0.0}
+            else:
+                todo.append(i)
+        if len(todo) < len(paths):
+            print(f"⏭️ {len(paths) - len(todo)} fichier(s) inchangé(s)")
+
+    options = {"trace": trace_path is not None, "profile_dir": profile_dir}
+    _run(func, paths, params, jobs, todo, reports, options)
+    if trace_path is not None:
+        tracing.write_traces(trace_path, [reports[i]["trace"] for i in todo if "trace" in reports[i]])
+
+    if cache is not None:
+        for i in todo:
+            if reports[i]["status"] == "ok":
+                cache.record(paths[i], params, output_for(paths[i]))
+        cache.save()
+    return reports
+
+
+def _run(func, paths, params, jobs, todo, reports, options):
+    if jobs <= 1:
+        for i in todo:
+            reports[i] = run_one(func, paths[i], params, **options)
+            print_report(reports[i])
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(run_one, func, paths[i], params, **options): i for i in todo}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                reports[i] = future.result()
+            except Exception as e:  # worker mort (mémoire, signal...)
+                reports[i] = {"name": paths[i].name, "status": "error", "message": f"{type(e).__name__}: {e}",
+                              "result": None, "seconds": 0.0}
+            print_report(reports[i])
+
+
+def stage_totals(reports):
+    """Somme des temps par étape sur les rapports qui en ont (voir timings_of)."""
+    totals = {}
+    for report in reports:
+        if timings_of(report["result"]) is not None:
+            for stage, seconds in timings_of(report["result"]).items():
+                totals[stage] = totals.get(stage, 0.0) + seconds
+    return totals
+
+
+def print_summary(reports, elapsed, summary_path=None):
+    ok = sum(r["status"] == "ok" for r in reports)
+    cached = sum(r["status"] == "cached" for r in reports)
+    failed = [r["name"] for r in reports if r["status"] == "error"]
+    totals = stage_totals(reports)
+    print(f"📊 {ok}/{len(reports)} OK, {cached} inchangé(s), en {elapsed:.1f} s")
+    if totals:
+        print("⏱️ " + describe(totals))
+    if failed:
+        print(f"⚠️ Échecs : {', '.join(failed)}")
+    if summary_path:
+        summary = {
+            "elapsed": elapsed,
+            "ok": ok,
+            "cached": cached,
+            "failed": failed,
+            "stages": totals,
+            "items": [{k: v for k, v in r.items() if k not in ("result", "trace")} for r in reports],
+        }
+        with open(summary_path, "w") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
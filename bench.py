@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Banc d'essai de la chaîne image -> SVG -> STL sur des formes synthétiques.
+
+Les entrées sont générées de façon déterministe (graine fixe) : cercles,
+étoiles, cœurs et « scans » bruités à plusieurs résolutions, plus des SVG
+de 10 à 5000 segments. Chaque étape est chronométrée séparément
+(meilleur de --repeat passages), le pic mémoire est mesuré par
+tracemalloc sur un passage à part (allocations Python / numpy seulement,
+pas celles internes d'OpenCV ou de GEOS). Chaque lancement est ajouté à
+l'historique JSON et comparé au précédent : une étape plus lente de plus
+de --threshold est signalée comme régression.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+import cv2
+import numpy as np
+from config import BENCH_PATH
+from batch import StageTimer
+import img2svg
+import svg2stl
+import tracing
+from fitCurves import PRESETS
+from stlwriter import write_stl
+
+SEED = 7
+BACKGROUND = (60, 170, 40)  # vert uni, comme les photos sur fond
+FOREGROUND = (30, 30, 200)
+RESOLUTIONS = (800, 2000, 4000)  # plus grand côté des images, px
+SEGMENTS = (10, 100, 1000, 5000)  # segments des SVG synthétiques
+THRESHOLD = 0.15  # ralentissement relatif signalé comme régression
+MIN_DELTA = 0.002  # s, en dessous : bruit de mesure
+
+
+# --- Entrées synthétiques
+
+def shape_points(kind, size):
+    """Contour (N, 2) int32 d'une forme centrée dans un carré de côté size."""
+    t = np.linspace(0, 2 * np.pi, 720, endpoint=False)
+    c, r = size / 2, 0.38 * size
+    if kind == "circle":
+        x, y = c + r * np.cos(t), c + r * np.sin(t)
+    elif kind == "star":
+        rho = r * np.where(np.arange(10) % 2 == 0, 1.0, 0.45)
+        a = np.arange(10) * np.pi / 5 - np.pi / 2
+        x, y = c + rho * np.cos(a), c + rho * np.sin(a)
+    else:  # heart
+        x = 16 * np.sin(t) ** 3
+        y = -(13 * np.cos(t) - 5 * np.cos(2 * t) - 2 * np.cos(3 * t) - np.cos(4 * t))
+        x, y = c + x * r / 17, c + y * r / 17
+    return np.stack([x, y], axis=1).round().astype(np.int32)
+
+
+def synthetic_image(kind, size, rng=None, gradient=0):
+    """
+    Image BGR size x (3/4 size) : forme pleine sur fond uni, bruitée pour
+    kind='scan'. gradient : éclairage inégal, +gradient niveaux de gauche à
+    droite et +gradient / 2 de haut en bas (vignettage, dérive du fond).
+    """
+    h = size * 3 // 4
+    img = np.empty((h, size, 3), np.uint8)
+    img[:] = BACKGROUND
+    pts = shape_points("heart" if kind == "scan" else kind, h) + ((size - h) // 2, 0)
+    cv2.fillPoly(img, [pts], FOREGROUND)
+    if kind == "scan":
+        rng = rng or np.random.default_rng(SEED)
+        noise = rng.integers(-5, 6, img.shape, dtype=np.int16)
+        img = np.clip(img + noise, 0, 255).astype(np.uint8)
+    if gradient:
+        ramp = np.linspace(0, gradient, size)[None, :] + np.linspace(0, gradient / 2, h)[:, None]
+        img = np.clip(img + ramp[..., None], 0, 255).astype(np.uint8)
+    return img
+
+
+def synthetic_beziers(n, size=800.0):
+    """
+    Contour fermé lisse de n Bézier cubiques (N, 4, 2) en px : rosace
+    r(t) = R (1 + 0.15 sin(k t)) découpée en n segments tangents (Hermite).
+    """
+    k = max(3, n // 8)
+    t = np.linspace(0, 2 * np.pi, n + 1)
+    r = 0.4 * size * (1 + 0.15 * np.sin(k * t))
+    dr = 0.4 * size * 0.15 * k * np.cos(k * t)
+    p = np.stack([r * np.cos(t), r * np.sin(t)], axis=1) + size / 2
+    dp = np.stack([dr * np.cos(t) - r * np.sin(t), dr * np.sin(t) + r * np.cos(t)], axis=1)
+    h = (t[1] - t[0]) / 3
+    return np.stack([p[:-1], p[:-1] + h * dp[:-1], p[1:] - h * dp[1:], p[1:]], axis=1)
+
+
+# --- Étapes
+
+def run_image(img, workdir, params):
+    """Image en mémoire -> SVG -> STL, toutes les étapes chronométrées."""
+    timer = StageTimer()
+    rings = img2svg.segment(img, params)
+    timer.lap("segmentation")
+    points = img2svg.contour_points(rings, params)
+    timer.lap("contour")
+    original = None
+    if params["simplify"] > 0:
+        original, points = points, img2svg.simplify_points(points, params)
+        timer.lap("simplify")
+    beziers = img2svg.fit_rings(points, params, original)
+    timer.lap("fit")
+    svg_path = workdir / "bench.svg"
+    img2svg.write_svg(svg_path, beziers, img.shape[1::-1], params["svg_precision"])
+    timer.lap("serialize")
+    run_svg(svg_path, workdir, params, timer)
+    return timer
+
+
+def run_svg(svg_path, workdir, params, timer=None):
+    """SVG -> STL, étapes parse / sample / buffer / extrude / export."""
+    timer = timer or StageTimer()
+    rings = svg2stl.load_beziers(svg_path, params)
+    timer.lap("parse")
+    tracing.count("bezier_segments", sum(len(r) for r in rings))
+    base = svg2stl.outline_mm(rings, params)
+    timer.lap("sample")
+    mesh = svg2stl.cutter_mesh(base, params, timer)
+    write_stl(workdir / "bench.stl", mesh.vertices, mesh.faces)
+    timer.lap("export")
+    return timer
+
+
+def cases(quick=False, preset=None, fit_workers=1):
+    """(nom, unité, quantité, préparation) ; la préparation renvoie la fonction à mesurer."""
+    params = {**img2svg.DEFAULT_PARAMS, **svg2stl.DEFAULT_PARAMS, "fit_workers": fit_workers}
+    if preset:
+        params["fit_preset"] = preset
+    resolutions = RESOLUTIONS[:1] if quick else RESOLUTIONS
+    segments = SEGMENTS[:2] if quick else SEGMENTS
+    for kind in ("circle", "star", "heart", "scan"):
+        for size in resolutions:
+            def setup(workdir, kind=kind, size=size):
+                img = synthetic_image(kind, size)
+                return lambda: run_image(img.copy(), workdir, params)
+            yield f"img-{kind}-{size}", "Mpx", size * (size * 3 // 4) / 1e6, setup
+    for n in segments:
+        def setup(workdir, n=n):
+            svg_path = workdir / f"rosace-{n}.svg"
+            img2svg.write_svg(svg_path, [synthetic_beziers(n)], (800, 800), 3)
+            return lambda: run_svg(svg_path, workdir, params)
+        yield f"svg-{n}", "seg", n, setup
+
+
+# --- Contrôles
+
+def check_segmentations(sizes=RESOLUTIONS[1:], gradient=60):
+    """
+    Parité de segment_pyramid avec segment_fast sur les formes synthétiques,
+    fond uni et fond en dégradé (le fond près de l'objet s'écarte alors de
+    plus de tol du point de départ) : masques identiques à 0.01 % près,
+    boîtes englobantes à 1 px près.
+    """
+    params = img2svg.DEFAULT_PARAMS
+    for kind in ("circle", "star", "heart", "scan"):
+        for size in sizes:
+            for grad in (0, gradient):
+                img = synthetic_image(kind, size, gradient=grad)
+                masks, boxes = [], []
+                for name in ("fast", "pyramid"):
+                    outline = img2svg.SEGMENTATIONS[name](img.copy(), params)
+                    mask = np.zeros(img.shape[:2], np.uint8)
+                    cv2.drawContours(mask, [outline], -1, 1, -1)
+                    masks.append(mask)
+                    boxes.append(np.array(cv2.boundingRect(outline)))
+                diff = int((masks[0] != masks[1]).sum())
+                assert diff <= 1e-4 * masks[0].sum(), (kind, size, grad, diff)
+                assert np.abs(boxes[0] - boxes[1]).max() <= 1, (kind, size, grad, boxes)
+    print("✅ segment_pyramid = segment_fast (fond uni et en dégradé)")
+
+
+# --- Mesure
+
+def measure(func, repeat):
+    """
+    Meilleur temps par étape sur repeat passages (après un passage de
+    chauffe), puis pic mémoire (Mo) et compteurs tracing sur un passage tracé.
+    """
+    func()
+    best = {}
+    for _ in range(repeat):
+        for stage, seconds in func().timings.items():
+            best[stage] = min(best.get(stage, seconds), seconds)
+    tracemalloc.start()
+    try:
+        with tracing.traced("bench") as trace:
+            func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 2**20, trace.counters
+
+
+def run(quick=False, repeat=3, only=None, preset=None, fit_workers=1):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        for name, unit, amount, setup in cases(quick, preset, fit_workers):
+            if only and only not in name:
+                continue
+            func = setup(workdir)
+            stages, peak, counters = measure(func, repeat)
+            total = sum(stages.values())
+            results[name] = {
+                "stages": stages,
+                "total": total,
+                "throughput": amount / total,
+                "unit": f"{unit}/s",
+                "peak_mb": peak,
+                "counters": counters,
+            }
+            print(f"⏱️ {name:<18} {total * 1000:8.1f} ms  {amount / total:10.2f} {unit}/s  {peak:7.1f} Mo  "
+                  f"{counters.get('bezier_segments', 0)} seg.  {counters.get('fit_iterations', 0)} it.  "
+                  f"{counters.get('fit_points', 0)}/{counters.get('contour_points', 0)} pts")
+    return results
+
+
+# --- Historique
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=Path(__file__).resolve().parent)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def load_history(path=BENCH_PATH):
+    path = Path(path)
+    return json.loads(path.read_text()) if path.exists() else []
+
+
+def save_history(history, path=BENCH_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(history, indent=1))
+    tmp.replace(path)
+
+
+def compare(current, baseline, threshold=THRESHOLD):
+    """Régressions (cas, étape, avant, après) : étapes plus lentes de plus de threshold."""
+    regressions = []
+    for name, res in current.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        for stage, seconds in [*res["stages"].items(), ("total", res["total"])]:
+            before = old["total"] if stage == "total" else old["stages"].get(stage)
+            if before and seconds > before * (1 + threshold) and seconds - before > MIN_DELTA:
+                regressions.append((name, stage, before, seconds))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai image -> SVG -> STL (formes synthétiques)")
+    parser.add_argument("--quick", action="store_true", help="petites images et petits SVG seulement")
+    parser.add_argument("--repeat", type=int, default=3, help="passages par cas (meilleur temps retenu)")
+    parser.add_argument("--only", help="ne lance que les cas dont le nom contient ce texte")
+    parser.add_argument("--preset", choices=PRESETS, help="preset de fit (défaut : celui d'img2svg)")
+    parser.add_argument("--fit-workers", type=int, default=1, help="processus pour le fit de chaque contour")
+    parser.add_argument("--label", default="", help="étiquette du lancement dans l'historique")
+    parser.add_argument("--history", type=Path, default=BENCH_PATH, help="fichier JSON d'historique")
+    parser.add_argument("--baseline", type=int, default=-1, help="lancement de référence (index dans l'historique)")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="ralentissement relatif toléré")
+    parser.add_argument("--no-save", action="store_true", help="n'ajoute pas ce lancement à l'historique")
+    parser.add_argument("--check", action="store_true", help="contrôles de parité seulement, sans mesure")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        check_segmentations()
+        return 0
+
+    history = load_history(args.history)
+    results = run(args.quick, args.repeat, args.only, args.preset, args.fit_workers)
+    entry = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "label": args.label,
+        "preset": args.preset or img2svg.DEFAULT_PARAMS["fit_preset"],
+        "fit_workers": args.fit_workers,
+        "commit": git_commit(),
+        "results": results,
+    }
+
+    regressions = []
+    if history:
+        baseline = history[args.baseline]
+        regressions = compare(results, baseline["results"], args.threshold)
+        print(f"📊 comparé à {baseline['date']} {baseline.get('label') or ''} ({baseline.get('commit')})")
+        for name, stage, before, after in regressions:
+            print(f"⚠️ régression {name} {stage} : {before * 1000:.1f} -> {after * 1000:.1f} ms "
+                  f"(+{(after / before - 1) * 100:.0f} %)")
+        if not regressions:
+            print("✅ pas de régression")
+
+    if not args.no_save:
+        save_history(history + [entry], args.history)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,3 +17,92 @@ def qprimeprime(ctrlPoly, t):
     return 6*(1.0-t) * (ctrlPoly[2]-2*ctrlPoly[1]+ctrlPoly[0]) + 6*(t) * (ctrlPoly[3]-2*ctrlPoly[2]+ctrlPoly[1])
 
 
+# Array-aware versions of q, qprime and qprimeprime.
+# t is a vector of M parameters (or an array of shape (..., M) to give each
+# curve its own parameters), ctrlPoly is one curve (4, 2) or a stack of
+# curves (..., 4, 2). The result has shape (..., M, 2).
+
+# cubic Bernstein basis at every t, shape (..., M, 4)
+def bernstein(t):
+    t = asarray(t, dtype=float)
+    mt = 1.0 - t
+    return stack((mt**3, 3*mt**2 * t, 3*mt * t**2, t**3), axis=-1)
+
+
+# basis of the first derivative at every t, shape (..., M, 4)
+def bernsteinPrime(t):
+    t = asarray(t, dtype=float)
+    mt = 1.0 - t
+    return stack((-3*mt**2, 3*mt**2 - 6*mt*t, 6*mt*t - 3*t**2, 3*t**2), axis=-1)
+
+
+# basis of the second derivative at every t, shape (..., M, 4)
+def bernsteinPrimePrime(t):
+    t = asarray(t, dtype=float)
+    mt = 1.0 - t
+    return stack((6*mt, 6*t - 12*mt, 6*mt - 12*t, 6*t), axis=-1)
+
+
+# applies a basis (..., M, 4) to control points (..., 4, 2)
+def combine(basis, ctrlPoly):
+    return einsum('...mk,...kd->...md', basis, asarray(ctrlPoly, dtype=float))
+
+
+# evaluates cubic bezier(s) at all t, return points
+def qBatch(ctrlPoly, t):
+    return combine(bernstein(t), ctrlPoly)
+
+
+# evaluates cubic bezier(s) first derivative at all t
+def qprimeBatch(ctrlPoly, t):
+    return combine(bernsteinPrime(t), ctrlPoly)
+
+
+# evaluates cubic bezier(s) second derivative at all t
+def qprimeprimeBatch(ctrlPoly, t):
+    return combine(bernsteinPrimePrime(t), ctrlPoly)
+
+
+# evaluates points, first and second derivatives in one call
+def evalBatch(ctrlPoly, t):
+    ctrlPoly = asarray(ctrlPoly, dtype=float)
+    return combine(bernstein(t), ctrlPoly), combine(bernsteinPrime(t), ctrlPoly), combine(bernsteinPrimePrime(t), ctrlPoly)
+
+
+# flattens cubic beziers (N, 4, 2) into a polyline with chord error <= tol.
+# A cubic sampled at n uniform steps deviates from its chords by at most
+# max|q''| / (8 n**2), and max|q''| is reached at an end point, so each
+# curve gets the smallest n meeting the bound: straight lines get n = 1.
+# Returns the start point of every step plus the end of the last curve.
+def flatten(ctrlPolys, tol):
+    ctrlPolys = asarray(ctrlPolys, dtype=float).reshape(-1, 4, 2)
+    d2 = 6 * maximum(linalg.norm(ctrlPolys[:, 0] - 2*ctrlPolys[:, 1] + ctrlPolys[:, 2], axis=1),
+                     linalg.norm(ctrlPolys[:, 1] - 2*ctrlPolys[:, 2] + ctrlPolys[:, 3], axis=1))
+    n = maximum(1, ceil(sqrt(d2 / (8.0 * tol)))).astype(int)
+    curve = repeat(arange(len(ctrlPolys)), n)
+    step = arange(n.sum()) - repeat(cumsum(n) - n, n)
+    t = step / n[curve]
+    points = einsum('mk,mkd->md', bernstein(t), ctrlPolys[curve])
+    return concatenate((points, ctrlPolys[-1:, 3]))
+
+
+# exact bounding box of cubic beziers (N, 4, 2): (xmin, xmax, ymin, ymax).
+# Extrema are at the end points or where q'(t) = 0 on each axis.
+def bbox(ctrlPolys):
+    ctrlPolys = asarray(ctrlPolys, dtype=float).reshape(-1, 4, 2)
+    a = ctrlPolys[:, 1] - ctrlPolys[:, 0]
+    b = ctrlPolys[:, 2] - ctrlPolys[:, 1]
+    c = ctrlPolys[:, 3] - ctrlPolys[:, 2]
+    # q'(t) / 3 = A t**2 + B t + C, per curve and axis
+    A, B, C = a - 2*b + c, 2*(b - a), a
+    with errstate(divide='ignore', invalid='ignore'):
+        sq = sqrt(B**2 - 4*A*C)
+        linear = abs(A) < 1e-12
+        r1 = where(linear, -C / B, (-B + sq) / (2*A))
+        r2 = where(linear, nan, (-B - sq) / (2*A))
+    t = stack((zeros_like(r1), ones_like(r1), r1, r2), axis=1)  # (N, 4, 2)
+    t = where(isfinite(t) & (t >= 0) & (t <= 1), t, 0.0)
+    # each axis evaluated at its own candidate parameters
+    x = einsum('nmk,nk->nm', bernstein(t[:, :, 0]), ctrlPolys[:, :, 0])
+    y = einsum('nmk,nk->nm', bernstein(t[:, :, 1]), ctrlPolys[:, :, 1])
+    return x.min(), x.max(), y.min(), y.max()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Cache de construction incrémentale.
+
+Le manifeste JSON associe, par étape (img2svg, svg2stl...), à chaque
+fichier de sortie la clé qui l'a produit en dernier (hash du contenu
+d'entrée + hash des paramètres) et le hash de la sortie écrite.
+Un fichier est sauté si sa sortie existe, est inchangée et vient de la
+même clé : modifier un paramètre d'une étape ne reconstruit que cette
+étape, revenir à d'anciens paramètres reconstruit aussi (la sortie est
+écrasée à chaque fois), et une étape suivante ne refait que les fichiers
+dont le contenu a changé.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+
+def params_hash(params):
+    text = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class BuildCache:
+    def __init__(self, manifest_path, stage, force=False):
+        self.manifest_path = Path(manifest_path)
+        self.stage = stage
+        self.force = force  # tout reconstruire, en mettant quand même le manifeste à jour
+        try:
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+        self.manifest.pop("stages", None)  # ancien format clé -> sortie
+        # sortie -> [clé, hash de la sortie]
+        self.outputs = self.manifest.setdefault("outputs", {}).setdefault(stage, {})
+        # path -> [taille, mtime_ns, hash] pour ne pas relire les fichiers inchangés
+        self.files = self.manifest.setdefault("files", {})
+
+    def file_hash(self, path):
+        st = os.stat(path)
+        known = self.files.get(str(path))
+        if known and known[:2] == [st.st_size, st.st_mtime_ns]:
+            return known[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        self.files[str(path)] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+    def key(self, path, params):
+        return f"{self.file_hash(path)}:{params_hash(params)}"
+
+    def is_fresh(self, path, params, output):
+        if self.force:
+            return False
+        known = self.outputs.get(str(output))
+        if not known or known[0] != self.key(path, params) or not Path(output).exists():
+            return False
+        return self.file_hash(output) == known[1]
+
+    def record(self, path, params, output):
+        self.outputs[str(output)] = [self.key(path, params), self.file_hash(output)]
+
+    def save(self):
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp, self.manifest_path)
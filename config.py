@@ -10,3 +10,5 @@ IMG_IN_DIR = DATA_DIR / "images"
 SVG_OUT_DIR = DATA_DIR / "svg_out"
 SVG_IN_DIR = DATA_DIR / "svg_in"
 STL_OUT_DIR = DATA_DIR / "stl_out"
+MANIFEST_PATH = DATA_DIR / "manifest.json"  # cache de construction incrémentale
+BENCH_PATH = DATA_DIR / "bench_history.json"  # historique du banc d'essai (bench.py)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Contour sous-pixel à partir d'un contour entier (findContours).
+
+Les contours OpenCV suivent les centres des pixels de bord : un bord
+oblique devient un escalier de 1 px que fitCurve doit suivre au prix de
+nombreuses coupes à MAX_ERROR = 3. Ici le masque de la forme est
+légèrement flouté ; chaque point du contour est projeté (Newton le long
+du gradient) sur l'iso-niveau 0.5, c'est-à-dire le bord réel lissé.
+Le contour peut ensuite être ré-échantillonné à abscisse curviligne
+constante.
+"""
+
+import cv2
+import numpy as np
+from fitCurves import detectCorners
+
+SIGMA = 1.0  # flou du masque, px
+SPACING = 4.0  # pas de ré-échantillonnage, px (0 : pas de ré-échantillonnage)
+ITERATIONS = 3  # pas de Newton vers l'iso-niveau 0.5
+TOLERANCE = 0.05  # écart à l'iso-niveau au-delà duquel un point est écarté
+GAP = 32.0  # px, écart maximal entre deux points gardés par presimplify
+
+
+def _sample(field, pts):
+    """Interpolation bilinéaire de field aux points (N, 2) float."""
+    xy = pts.astype(np.float32).reshape(-1, 1, 2)
+    return cv2.remap(field, xy, None, cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE).ravel()
+
+
+def refine(contour, sigma=SIGMA, iterations=ITERATIONS, hole=False):
+    """
+    Contour entier (N, 1, 2) -> points (M, 2) float sur l'iso-niveau 0.5
+    du masque rempli puis flouté. Le contour est d'abord redensifié
+    (CHAIN_APPROX_NONE) pour avoir un point par pixel de bord ; les points
+    qui n'atteignent pas l'iso-niveau en ITERATIONS pas sont retirés.
+    hole : contour de trou (RETR_CCOMP), qui passe par les pixels de
+    l'objet autour du trou ; le masque est alors le trou seul.
+    """
+    margin = int(np.ceil(3 * sigma)) + 2
+    x, y, w, h = cv2.boundingRect(contour)
+    mask = np.zeros((h + 2 * margin, w + 2 * margin), np.uint8)
+    offset = (margin - x, margin - y)
+    cv2.drawContours(mask, [contour], -1, 1, -1, offset=offset)
+    if hole:
+        cv2.drawContours(mask, [contour], -1, 0, 1, offset=offset)
+    dense, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    if not dense:  # trou d'un pixel de large
+        return contour.reshape(-1, 2).astype(np.float64)
+    pts = max(dense, key=len).reshape(-1, 2).astype(np.float64)
+
+    field = cv2.GaussianBlur(mask.astype(np.float32), (0, 0), sigma)
+    gx = cv2.Sobel(field, cv2.CV_32F, 1, 0, ksize=3, scale=1 / 8)
+    gy = cv2.Sobel(field, cv2.CV_32F, 0, 1, ksize=3, scale=1 / 8)
+    for _ in range(iterations):
+        v = _sample(field, pts) - 0.5
+        g = np.stack([_sample(gx, pts), _sample(gy, pts)], axis=1)
+        g2 = (g * g).sum(axis=1)
+        ok = g2 > 1e-6
+        step = np.zeros_like(pts)
+        step[ok] = (v[ok] / g2[ok])[:, None] * g[ok]
+        pts -= np.clip(step, -1.0, 1.0)  # au plus 1 px par pas : reste sur le bon bord
+    # points non convergés (fond d'encoche étroite arrondi par le flou) : écartés
+    # plutôt que de laisser un aller-retour dans le contour
+    converged = np.abs(_sample(field, pts) - 0.5) < TOLERANCE
+    return pts[converged] - offset if converged.sum() >= 8 else pts - offset
+
+
+def resample(pts, spacing=SPACING, keep=()):
+    """
+    Contour fermé (N, 2) -> points régulièrement espacés de ~spacing le long
+    du contour. Les points d'indices keep (coins) sont conservés tels quels :
+    chaque portion entre deux d'entre eux est ré-échantillonnée séparément.
+    """
+    keep = np.unique(np.asarray(keep, dtype=int))
+    if not len(keep):
+        keep = np.array([0])
+    pts = np.roll(pts, -keep[0], axis=0)
+    keep = keep - keep[0]
+    closed = np.vstack([pts, pts[:1]])
+    s = np.concatenate([[0.0], np.cumsum(np.hypot(*np.diff(closed, axis=0).T))])
+    bounds = s[np.append(keep, len(pts))]
+    t = [np.linspace(a, b, max(int(round((b - a) / spacing)), 1), endpoint=False) for a, b in zip(bounds[:-1], bounds[1:])]
+    t = np.concatenate(t)
+    if len(t) < 8:
+        t = np.linspace(0.0, s[-1], 8, endpoint=False)
+    return np.stack([np.interp(t, s, closed[:, 0]), np.interp(t, s, closed[:, 1])], axis=1)
+
+
+def subpixel_contour(contour, sigma=SIGMA, spacing=SPACING, hole=False):
+    """
+    Contour entier OpenCV -> contour sous-pixel (N, 2), ré-échantillonné si
+    spacing > 0 en gardant les coins (detectCorners) pour que fitCurve les
+    retrouve à l'identique. hole : voir refine.
+    """
+    pts = refine(contour, sigma, hole=hole)
+    return resample(pts, spacing, detectCorners(pts)) if spacing > 0 else pts
+
+
+
+def simplify(pts, eps, keep=()):
+    """
+    Ramer-Douglas-Peucker vectorisé sur un contour fermé (N, 2) : renvoie
+    les indices (croissants) des points gardés, à moins de eps du contour
+    simplifié. Les indices keep sont toujours gardés. Tous les intervalles
+    encore ouverts sont traités ensemble, un niveau de découpe par passe.
+    """
+    n = len(pts)
+    keep = np.unique(np.asarray(keep, dtype=int) % n) if len(keep) else np.array([0])
+    if len(keep) == 1:  # contour fermé : il faut au moins deux points d'appui
+        keep = np.unique(np.append(keep, np.argmax(np.hypot(*(pts - pts[keep[0]]).T))))
+    shift = keep[0]
+    ext = np.roll(pts, -shift, axis=0)
+    ext = np.vstack([ext, ext[:1]])  # ext[n] = ext[0] : referme le contour
+    kept = np.zeros(n + 1, bool)
+    kept[keep - shift] = True
+    a = keep - shift
+    b = np.append(a[1:], n)
+    while True:
+        inner = b - a - 1
+        a, b, inner = a[inner > 0], b[inner > 0], inner[inner > 0]
+        if not len(a):
+            break
+        seg = np.repeat(np.arange(len(a)), inner)
+        starts = np.concatenate([[0], np.cumsum(inner)[:-1]])
+        idx = np.arange(len(seg)) - starts[seg] + a[seg] + 1
+        chord = (ext[b] - ext[a])[seg]
+        d = ext[idx] - ext[a][seg]
+        length = np.hypot(chord[:, 0], chord[:, 1])
+        cross = np.abs(chord[:, 0] * d[:, 1] - chord[:, 1] * d[:, 0])
+        dist = np.where(length > 1e-12, cross / np.maximum(length, 1e-12), np.hypot(d[:, 0], d[:, 1]))
+        top = np.maximum.reduceat(dist, starts)
+        at_top = np.flatnonzero(dist == top[seg])
+        far = idx[at_top[np.unique(seg[at_top], return_index=True)[1]]]
+        split = top > eps
+        kept[far[split]] = True
+        a, b = np.concatenate([a[split], far[split]]), np.concatenate([far[split], b[split]])
+    return np.sort((np.flatnonzero(kept[:n]) + shift) % n)
+
+
+
+def presimplify(pts, eps, gap=GAP):
+    """
+    Contour fermé (N, 2) -> sous-ensemble des points à passer à fitCurve :
+    RDP à eps px, plus un point au moins tous les gap px d'abscisse
+    curviligne (sans eux, une longue corde ne garde que ses extrémités et
+    fitCurve estime mal les tangentes, l'écart réel au contour dépasse
+    alors MAX_ERROR). Les coins (detectCorners) et leurs deux voisins sont
+    gardés : fitCurve y retrouve les mêmes coins.
+    """
+    corners = detectCorners(pts)
+    keep = [corners - 1, corners, corners + 1]
+    if gap > 0:
+        s = np.concatenate([[0.0], np.cumsum(np.hypot(*np.diff(pts, axis=0).T))])
+        keep.append(np.flatnonzero(np.diff(np.floor(s / gap))) + 1)
+    return pts[simplify(pts, eps, np.concatenate(keep))]
@@ -5,17 +5,354 @@
 """
 from __future__ import print_function
 from numpy import *
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import os
 import bezier
+import tracing
+
+
+# Fitting presets: iterations is the reparameterization budget per span,
+# a span is only reparameterized when its first max error is below
+# retryScale * error**2 (split right away otherwise), and the rounds stop
+# once one improves the max error by less than the minImprovement
+# fraction (None: never). 'production' is the original algorithm.
+PRESETS = {
+    'draft':      {'iterations': 4,  'retryScale': 1.0,  'minImprovement': 0.05},
+    'production': {'iterations': 20, 'retryScale': 1.0,  'minImprovement': None},
+    'archival':   {'iterations': 50, 'retryScale': 4.0,  'minImprovement': None},
+}
+
+
+def presetOptions(preset):
+    options = PRESETS[preset] if isinstance(preset, str) else {**PRESETS['production'], **preset}
+    return options['iterations'], options['retryScale'], options['minImprovement']
 
 
 # Fit one (ore more) Bezier curves to a set of points
-def fitCurve(points, maxError):
+# earlyStop: leave the reparameterization loop as soon as the max error
+# stops improving instead of running all iterations before splitting
+# closed: points are a closed contour (cv2.findContours), fitted corner to
+# corner, see fitClosedCurve
+# preset: reparameterization budget, see PRESETS
+def fitCurve(points, maxError, earlyStop=False, closed=False, preset='production'):
+    points = asarray(points, dtype=float)
+    if closed:
+        return fitClosedCurve(points, maxError, earlyStop, preset=preset)
     leftTangent = normalize(points[1] - points[0])
     rightTangent = normalize(points[-2] - points[-1])
-    return fitCubic(points, leftTangent, rightTangent, maxError)
+    return fitCubicIterative(points, leftTangent, rightTangent, maxError, earlyStop, preset=preset)
+
+
+def fitClosedCurve(points, maxError, earlyStop=False, cornerAngle=60.0, cornerRadius=4.0, preset='production'):
+    """
+       Fits a closed contour: corners are detected first (see detectCorners)
+       and every corner-to-corner span is fitted on its own, so the fitter
+       does not have to find the corners by splitting. The last segment ends
+       on the first point.
+    """
+    points, spans = closedSpans(points, cornerAngle, cornerRadius)
+    beziers = []
+    for first, last, leftTangent, rightTangent in spans:
+        beziers += fitCubicIterative(points, leftTangent, rightTangent, maxError, earlyStop, first, last, preset)
+    return beziers
+
+
+def fitClosedCurves(contours, maxError, earlyStop=False, cornerAngle=60.0, cornerRadius=4.0, preset='production',
+                    stats=None):
+    """
+       Fits several closed contours in one call. Every contour is cut at its
+       corners (closedSpans) and all of them are packed into one points
+       array. The spans of all contours are then fitted level by level: one
+       array pass (fitSpansOnce) tries every pending span, the ones within
+       maxError are kept, the ones too far off to be reparameterized are
+       split like fitSpan would and go to the next pass. Only the spans
+       that need reparameterization are handed to fitCubicIterative, by
+       index range into the same array. Returns one list of beziers per
+       contour, matching fitClosedCurve on each contour to rounding. When
+       stats is a list, one {'spans', 'iterations'} dict per contour is
+       appended to it (see fitSpan).
+    """
+    iterations, retryScale, _ = presetOptions(preset)
+    packed, offset = [], 0
+    nodes = []  # per span: bezCurve, list of beziers, or (left, right) node indices
+    pending = []  # (node, first, last, leftTangent, rightTangent, contour)
+    roots = []
+    for i, contour in enumerate(contours):
+        points, contourSpans = closedSpans(contour, cornerAngle, cornerRadius)
+        packed.append(points)
+        roots.append(list(range(len(nodes), len(nodes) + len(contourSpans))))
+        for first, last, lt, rt in contourSpans:
+            pending.append((len(nodes), first + offset, last + offset, lt, rt, i))
+            nodes.append(None)
+        offset += len(points)
+    if not packed:
+        return []
+    points = concatenate(packed)
+    counts = [{'spans': 0, 'iterations': 0} for _ in contours]
+
+    depth = 0
+    while pending:
+        tracing.peak("fit_depth", depth)
+        beziers, errors, splits = fitSpansOnce(points, [item[1:5] for item in pending], maxError)
+        nextPending = []
+        for (node, first, last, lt, rt, i), bezCurve, error, splitPoint in zip(pending, beziers, errors, splits):
+            if last - first > 1 and not error < maxError and error < retryScale * maxError**2 and iterations > 0:
+                nodes[node] = fitCubicIterative(points, lt, rt, maxError, earlyStop, first, last, preset, counts[i])
+                continue
+            if last - first > 1:  # one fitSpan call, not the two-point heuristic
+                tracing.count("fit_spans")
+                counts[i]['spans'] += 1
+            if last - first == 1 or error < maxError:
+                nodes[node] = bezCurve
+                continue
+            split = first + splitPoint
+            centerTangent = normalize(points[split-1] - points[split+1])
+            nodes[node] = (len(nodes), len(nodes) + 1)
+            nextPending += [(len(nodes), first, split, lt, centerTangent, i),
+                            (len(nodes) + 1, split, last, -centerTangent, rt, i)]
+            nodes += [None, None]
+        pending = nextPending
+        depth += 1
+
+    def collect(node):
+        item = nodes[node]
+        if isinstance(item, tuple):
+            return collect(item[0]) + collect(item[1])
+        return item if isinstance(item, list) else [item]
+
+    if stats is not None:
+        stats += counts
+    return [[bez for node in contourRoots for bez in collect(node)] for contourRoots in roots]
+
+
+def fitSpansOnce(points, spans, error):
+    """
+       First attempt of fitSpan on many (first, last, leftTangent,
+       rightTangent) spans of points at once: chord-length parameters,
+       generateBezierFast and computeMaxErrorFast over the concatenated
+       spans, the per-span sums and maxima taken with reduceat. Returns the
+       bezCurves (S, 4, 2), their max errors and split points (clamped like
+       fitSpan's). Two-point spans get the heuristic curve and no error.
+    """
+    first = array([span[0] for span in spans])
+    last = array([span[1] for span in spans])
+    leftTangent = array([span[2] for span in spans], dtype=float)
+    rightTangent = array([span[3] for span in spans], dtype=float)
+    lengths = last - first + 1
+    starts = concatenate(([0], cumsum(lengths)[:-1]))
+    seg = repeat(arange(len(spans)), lengths)
+    local = arange(lengths.sum()) - starts[seg]
+    pts = points[local + first[seg]]
+    p0, p3 = points[first], points[last]
+
+    # chord-length parameters, restarted at every span
+    step = zeros(len(pts))
+    step[1:] = linalg.norm(diff(pts, axis=0), axis=1)
+    step[starts] = 0.0
+    u = cumsum(step)
+    u -= u[starts][seg]
+    total = u[starts + lengths - 1]
+    flat = total == 0.0
+    u = where(flat[seg], local / (lengths - 1)[seg], u / where(flat, 1.0, total)[seg])
+
+    # generateBezierFast, every sum a per-span reduceat
+    b0, b1, b2, b3 = bezier.bernstein(u).T
+    A1 = b1[:, newaxis] * leftTangent[seg]
+    A2 = b2[:, newaxis] * rightTangent[seg]
+    tmp = pts - (b0 + b1)[:, newaxis] * p0[seg] - (b2 + b3)[:, newaxis] * p3[seg]
+    C00, C01, C11, X0, X1 = [add.reduceat((a * b).sum(axis=1), starts)
+                             for a, b in ((A1, A1), (A1, A2), (A2, A2), (A1, tmp), (A2, tmp))]
+    det_C0_C1 = C00 * C11 - C01 * C01
+    singular = det_C0_C1 == 0
+    det = where(singular, 1.0, det_C0_C1)
+    alpha_l = where(singular, 0.0, (X0 * C11 - X1 * C01) / det)
+    alpha_r = where(singular, 0.0, (C00 * X1 - C01 * X0) / det)
+    chord = p3 - p0
+    segLength = linalg.norm(chord, axis=1)
+    overshoot = (leftTangent * chord).sum(axis=1) * alpha_l - (rightTangent * chord).sum(axis=1) * alpha_r > segLength**2
+    heuristic = (alpha_l < 1.0e-6 * segLength) | (alpha_r < 1.0e-6 * segLength) | overshoot | (lengths == 2)
+    alpha_l = where(heuristic, segLength / 3.0, alpha_l)
+    alpha_r = where(heuristic, segLength / 3.0, alpha_r)
+    beziers = stack([p0, p0 + leftTangent * alpha_l[:, newaxis], p3 + rightTangent * alpha_r[:, newaxis], p3], axis=1)
+
+    # computeMaxErrorFast: per-span maximum, first point reaching it
+    q = (b0[:, newaxis] * beziers[seg, 0] + b1[:, newaxis] * beziers[seg, 1]
+         + b2[:, newaxis] * beziers[seg, 2] + b3[:, newaxis] * beziers[seg, 3])
+    dist = ((q - pts)**2).sum(axis=1)
+    dist[lengths[seg] == 2] = 0.0
+    errors = maximum.reduceat(dist, starts)
+    atMax = flatnonzero(dist == errors[seg])
+    splits = local[atMax[unique(seg[atMax], return_index=True)[1]]]
+    splits = where(errors > 0.0, splits, lengths // 2)
+    return beziers, errors, clip(splits, 1, maximum(lengths - 2, 1))
+
+
+def fitCurveParallel(points, maxError, earlyStop=False, closed=False, workers=None, minSpanPoints=256,
+                     preset='production', cornerAngle=60.0, cornerRadius=4.0, stats=None):
+    """
+       Same output as fitCurve (fitClosedCurve when closed, with the same
+       corner options), with the independent spans fitted across a process
+       pool. Spans (corner to corner when closed) are split the way
+       fitCubicIterative would until there is work for every worker, then
+       sent to the pool as index ranges into a shared memory copy of the
+       points. Segments are reassembled in curve order. stats: see fitSpan,
+       the workers' counts are added to it and to the tracing counters.
+    """
+    points = asarray(points, dtype=float)
+    workers = workers or os.cpu_count() or 1
+    if closed:
+        points, spans = closedSpans(points, cornerAngle, cornerRadius)
+    else:
+        spans = [(0, len(points) - 1, normalize(points[1] - points[0]), normalize(points[-2] - points[-1]))]
+    if workers == 1 or len(points) < 2 * minSpanPoints:
+        return [bez for first, last, lt, rt in spans
+                for bez in fitCubicIterative(points, lt, rt, maxError, earlyStop, first, last, preset, stats)]
+
+    items = splitSpans(points, spans, maxError, earlyStop, 2 * workers, minSpanPoints, preset, stats)
+    pending = [item for item in items if isinstance(item, tuple)]
+    if not pending:
+        return items
+
+    shm = shared_memory.SharedMemory(create=True, size=points.nbytes)
+    try:
+        ndarray(points.shape, dtype=float, buffer=shm.buf)[:] = points
+        with ProcessPoolExecutor(max_workers=int(minimum(workers, len(pending)))) as executor:
+            fitted = iter(executor.map(_fitSharedSpan, [(shm.name, points.shape, span, maxError, earlyStop, preset) for span in pending]))
+            beziers = []
+            for item in items:
+                if not isinstance(item, tuple):
+                    beziers.append(item)
+                    continue
+                spanBeziers, counts = next(fitted)
+                beziers += spanBeziers
+                tracing.count("fit_spans", counts['spans'])
+                tracing.count("fit_iterations", counts['iterations'])
+                if stats is not None:
+                    stats['spans'] += counts['spans']
+                    stats['iterations'] += counts['iterations']
+    finally:
+        shm.close()
+        shm.unlink()
+    return beziers
 
 
-def fitCubic(points, leftTangent, rightTangent, error):
+def splitSpans(points, spans, maxError, earlyStop=False, target=8, minSpanPoints=256, preset='production',
+               stats=None):
+    """
+       Splits the largest spans like fitCubicIterative does, until there are
+       target spans left to fit or they are all smaller than minSpanPoints.
+       Returns, in curve order, fitted bezCurves and the (first, last,
+       leftTangent, rightTangent) spans still to fit.
+    """
+    items = list(spans)
+    while True:
+        pending = [i for i, item in enumerate(items) if isinstance(item, tuple)]
+        if len(pending) >= target:
+            return items
+        if not pending:
+            return items
+        i = pending[argmax([items[i][1] - items[i][0] for i in pending])]
+        if items[i][1] - items[i][0] < minSpanPoints:
+            return items
+
+        first, last, leftTangent, rightTangent = items[i]
+        span = points[first:last+1]
+        bezCurve, splitPoint = fitSpan(span, leftTangent, rightTangent, maxError, earlyStop, preset, stats)
+        if bezCurve is not None:
+            items[i] = bezCurve
+            continue
+        centerTangent = normalize(span[splitPoint-1] - span[splitPoint+1])
+        items[i:i+1] = [(first, first + splitPoint, leftTangent, centerTangent),
+                        (first + splitPoint, last, -centerTangent, rightTangent)]
+
+
+def _fitSharedSpan(task):
+    # worker side of fitCurveParallel: fit one span of the shared points
+    name, shape, (first, last, leftTangent, rightTangent), maxError, earlyStop, preset = task
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        points = ndarray(shape, dtype=float, buffer=shm.buf)
+        counts = {'spans': 0, 'iterations': 0}
+        beziers = fitCubicIterative(points, leftTangent, rightTangent, maxError, earlyStop, first, last, preset, counts)
+        # copy out of the shared buffer before it is closed
+        beziers = [array(bez, dtype=float) for bez in beziers]
+        del points
+    finally:
+        shm.close()
+    return beziers, counts
+
+
+def closedSpans(points, cornerAngle=60.0, cornerRadius=4.0):
+    """
+       Cuts a closed contour at its corners. Returns the contour rotated to
+       start on a corner and closed by repeating its first point, and the
+       spans (first, last, leftTangent, rightTangent) between consecutive
+       corners. Tangents at a corner are one-sided, estimated on the side of
+       the span. Without corners the contour is a single span whose end
+       tangents are opposite, so the curve stays smooth across the seam.
+    """
+    points = asarray(points, dtype=float)
+    if len(points) > 1 and array_equal(points[0], points[-1]):
+        points = points[:-1]
+    n = len(points)
+
+    corners = detectCorners(points, cornerAngle, cornerRadius)
+    if len(corners) == 0:
+        tangent = normalize(points[1] - points[-1])
+        return concatenate((points, points[:1])), [(0, n, tangent, -tangent)]
+
+    points = roll(points, -corners[0], axis=0)
+    points = concatenate((points, points[:1]))
+    bounds = append(corners - corners[0], n)
+
+    # arc length position of each point, used to look cornerRadius along the span
+    s = concatenate(([0.0], cumsum(linalg.norm(diff(points, axis=0), axis=1))))
+    spans = []
+    for first, last in zip(bounds[:-1], bounds[1:]):
+        ahead = clip(searchsorted(s, s[first] + cornerRadius), first + 1, last)
+        behind = clip(searchsorted(s, s[last] - cornerRadius, side='right') - 1, first, last - 1)
+        spans.append((first, last, normalize(points[ahead] - points[first]), normalize(points[behind] - points[last])))
+    return points, spans
+
+
+def detectCorners(points, cornerAngle=60.0, cornerRadius=4.0):
+    """
+       Indices of the corners of a closed contour, in contour order. The
+       turning angle at each point is measured between the points found
+       cornerRadius before and after it along the contour, which smooths out
+       pixel staircases. Points turning by more than cornerAngle degrees are
+       corners; only the sharpest one is kept within cornerRadius.
+    """
+    n = len(points)
+    s = concatenate(([0.0], cumsum(linalg.norm(roll(points, -1, axis=0) - points, axis=1))))
+    total = s[-1]
+    if n < 3 or total <= 2 * cornerRadius:
+        return zeros(0, dtype=int)
+
+    # arc positions over three laps to look across the seam
+    laps = concatenate((s[:-1] - total, s[:-1], s[:-1] + total))
+    behind = (searchsorted(laps, s[:-1] + total - cornerRadius, side='right') - 1) % n
+    ahead = searchsorted(laps, s[:-1] + total + cornerRadius) % n
+    vin = points - points[behind]
+    vout = points[ahead] - points
+    cross = vin[:, 0] * vout[:, 1] - vin[:, 1] * vout[:, 0]
+    turn = degrees(abs(arctan2(cross, (vin * vout).sum(axis=1))))
+
+    # non-maximum suppression, sharpest corners first
+    candidates = flatnonzero(turn >= cornerAngle)
+    corners = []
+    for i in candidates[argsort(-turn[candidates], kind='stable')]:
+        gap = abs(s[i] - s[corners])
+        if (minimum(gap, total - gap) > cornerRadius).all():
+            corners.append(i)
+    return sort(array(corners, dtype=int))
+
+
+def fitCubic(points, leftTangent, rightTangent, error, earlyStop=False, preset='production'):
+    # Recursive fitter on array slices, kept as the reference for fitCubicIterative
+    iterations, retryScale, minImprovement = presetOptions(preset)
+
     # Use heuristic if region only has two points in it
     if (len(points) == 2):
         dist = linalg.norm(points[0] - points[1]) / 3.0
@@ -24,31 +361,117 @@ def fitCubic(points, leftTangent, rightTangent, error):
 
     # Parameterize points, and attempt to fit curve
     u = chordLengthParameterize(points)
-    bezCurve = generateBezier(points, u, leftTangent, rightTangent)
+    bezCurve = generateBezierFast(points, u, leftTangent, rightTangent)
     # Find max deviation of points to fitted curve
-    maxError, splitPoint = computeMaxError(points, bezCurve, u)
+    maxError, splitPoint = computeMaxErrorFast(points, bezCurve, u)
     if maxError < error:
         return [bezCurve]
 
     # If error not too large, try some reparameterization and iteration
-    if maxError < error**2:
-        for i in range(20):
-            uPrime = reparameterize(bezCurve, points, u)
-            bezCurve = generateBezier(points, uPrime, leftTangent, rightTangent)
-            maxError, splitPoint = computeMaxError(points, bezCurve, uPrime)
+    if maxError < retryScale * error**2:
+        for i in range(iterations):
+            uPrime = reparameterizeFast(bezCurve, points, u)
+            bezCurve = generateBezierFast(points, uPrime, leftTangent, rightTangent)
+            prevError = maxError
+            maxError, splitPoint = computeMaxErrorFast(points, bezCurve, uPrime)
             if maxError < error:
                 return [bezCurve]
+            if earlyStop and maxError >= prevError:
+                break
+            if minImprovement is not None and maxError > (1 - minImprovement) * prevError:
+                break
             u = uPrime
 
     # Fitting failed -- split at max error point and fit recursively
+    splitPoint = int(clip(splitPoint, 1, len(points) - 2))
     beziers = []
     centerTangent = normalize(points[splitPoint-1] - points[splitPoint+1])
-    beziers += fitCubic(points[:splitPoint+1], leftTangent, centerTangent, error)
-    beziers += fitCubic(points[splitPoint:], -centerTangent, rightTangent, error)
+    beziers += fitCubic(points[:splitPoint+1], leftTangent, centerTangent, error, earlyStop, preset)
+    beziers += fitCubic(points[splitPoint:], -centerTangent, rightTangent, error, earlyStop, preset)
 
     return beziers
 
 
+def fitCubicIterative(points, leftTangent, rightTangent, error, earlyStop=False, first=0, last=None,
+                      preset='production', stats=None):
+    """
+       Same output as fitCubic without recursion: the spans still to fit are
+       index ranges [first, last] into the shared points array, kept on an
+       explicit stack. The left half of a split is pushed last so segments
+       come out in curve order.
+    """
+    if last is None:
+        last = len(points) - 1
+
+    beziers = []
+    stack = [(first, last, leftTangent, rightTangent, 0)]
+    while stack:
+        first, last, leftTangent, rightTangent, depth = stack.pop()
+        tracing.peak("fit_depth", depth)
+        span = points[first:last+1]
+        bezCurve, splitPoint = fitSpan(span, leftTangent, rightTangent, error, earlyStop, preset, stats)
+        if bezCurve is not None:
+            beziers.append(bezCurve)
+            continue
+
+        centerTangent = normalize(span[splitPoint-1] - span[splitPoint+1])
+        stack.append((first + splitPoint, last, -centerTangent, rightTangent, depth + 1))
+        stack.append((first, first + splitPoint, leftTangent, centerTangent, depth + 1))
+
+    return beziers
+
+
+def fitSpan(points, leftTangent, rightTangent, error, earlyStop=False, preset='production', stats=None):
+    """
+       Tries to fit a single cubic on points. Returns (bezCurve, None) when
+       the fit is within error, (None, splitPoint) when the span has to be
+       split, for fitCubicIterative. The preset (a name
+       in PRESETS or a dict of the same keys) bounds the reparameterization.
+       stats: optional dict whose 'spans' and 'iterations' counts are
+       incremented, like the fit_spans / fit_iterations tracing counters.
+    """
+    iterations, retryScale, minImprovement = presetOptions(preset)
+
+    # Use heuristic if region only has two points in it
+    if (len(points) == 2):
+        dist = linalg.norm(points[0] - points[1]) / 3.0
+        bezCurve = [points[0], points[0] + leftTangent * dist, points[1] + rightTangent * dist, points[1]]
+        return bezCurve, None
+
+    tracing.count("fit_spans")
+    if stats is not None:
+        stats['spans'] += 1
+
+    # Parameterize points, and attempt to fit curve
+    u = chordLengthParameterizeFast(points)
+    bezCurve = generateBezierFast(points, u, leftTangent, rightTangent)
+    # Find max deviation of points to fitted curve
+    maxError, splitPoint = computeMaxErrorFast(points, bezCurve, u)
+    if maxError < error:
+        return bezCurve, None
+
+    # If error not too large, try some reparameterization and iteration
+    if maxError < retryScale * error**2:
+        for i in range(iterations):
+            tracing.count("fit_iterations")
+            if stats is not None:
+                stats['iterations'] += 1
+            uPrime = reparameterizeFast(bezCurve, points, u)
+            bezCurve = generateBezierFast(points, uPrime, leftTangent, rightTangent)
+            prevError = maxError
+            maxError, splitPoint = computeMaxErrorFast(points, bezCurve, uPrime)
+            if maxError < error:
+                return bezCurve, None
+            if earlyStop and maxError >= prevError:
+                break
+            if minImprovement is not None and maxError > (1 - minImprovement) * prevError:
+                break
+            u = uPrime
+
+    # the split point must leave at least two points on each side
+    return None, int(clip(splitPoint, 1, len(points) - 2))
+
+
 def generateBezier(points, parameters, leftTangent, rightTangent):
     bezCurve = [points[0], None, None, points[-1]]
 
@@ -85,9 +508,13 @@ def generateBezier(points, parameters, leftTangent, rightTangent):
     # If alpha negative, use the Wu/Barsky heuristic (see text) */
     # (if alpha is 0, you get coincident control points that lead to
     # divide by zero in any subsequent NewtonRaphsonRootFind() call. */
+    # Same fallback when the control points overshoot each other along the
+    # chord: nearly straight spans with very few points (corner to corner).
     segLength = linalg.norm(points[0] - points[-1])
     epsilon = 1.0e-6 * segLength
-    if alpha_l < epsilon or alpha_r < epsilon:
+    chord = points[-1] - points[0]
+    overshoot = dot(leftTangent, chord) * alpha_l - dot(rightTangent, chord) * alpha_r > segLength**2
+    if alpha_l < epsilon or alpha_r < epsilon or overshoot:
         # fall back on standard (probably inaccurate) formula, and subdivide further if needed.
         bezCurve[1] = bezCurve[0] + leftTangent * (segLength / 3.0)
         bezCurve[2] = bezCurve[3] + rightTangent * (segLength / 3.0)
@@ -103,10 +530,74 @@ def generateBezier(points, parameters, leftTangent, rightTangent):
     return bezCurve
 
 
+def generateBezierFast(points, parameters, leftTangent, rightTangent):
+    """
+       Same least-squares fit as generateBezier, computed with whole-array
+       operations: the Bernstein bases of all parameters at once, then the
+       2x2 normal equations C * alpha = X as sums over the points.
+       generateBezier is kept as the reference implementation.
+    """
+    points = asarray(points, dtype=float)
+    u = asarray(parameters, dtype=float)
+    first, last = points[0], points[-1]
+
+    # Bernstein bases, one row per parameter
+    b0, b1, b2, b3 = bezier.bernstein(u).T
+
+    # compute the A's
+    A1 = b1[:, newaxis] * leftTangent
+    A2 = b2[:, newaxis] * rightTangent
+
+    # Create the C and X matrices
+    C00 = (A1 * A1).sum()
+    C01 = (A1 * A2).sum()
+    C11 = (A2 * A2).sum()
+
+    tmp = points - (b0 + b1)[:, newaxis] * first - (b2 + b3)[:, newaxis] * last
+    X0 = (A1 * tmp).sum()
+    X1 = (A2 * tmp).sum()
+
+    # Compute the determinants of C and X
+    det_C0_C1 = C00 * C11 - C01 * C01
+    det_C0_X  = C00 * X1 - C01 * X0
+    det_X_C1  = X0 * C11 - X1 * C01
+
+    # Finally, derive alpha values
+    alpha_l = 0.0 if det_C0_C1 == 0 else det_X_C1 / det_C0_C1
+    alpha_r = 0.0 if det_C0_C1 == 0 else det_C0_X / det_C0_C1
+
+    # Wu/Barsky heuristic, see generateBezier. Also used when the control
+    # points overshoot each other along the chord, which happens on
+    # nearly straight spans with very few points (corner to corner).
+    segLength = linalg.norm(first - last)
+    epsilon = 1.0e-6 * segLength
+    chord = last - first
+    overshoot = dot(leftTangent, chord) * alpha_l - dot(rightTangent, chord) * alpha_r > segLength**2
+    if alpha_l < epsilon or alpha_r < epsilon or overshoot:
+        alpha_l = alpha_r = segLength / 3.0
+
+    return array([first, first + leftTangent * alpha_l, last + rightTangent * alpha_r, last])
+
+
 def reparameterize(bezier, points, parameters):
     return [newtonRaphsonRootFind(bezier, point, u) for point, u in zip(points, parameters)]
 
 
+def reparameterizeFast(bez, points, parameters):
+    """
+       One Newton-Raphson step (see newtonRaphsonRootFind) applied to all
+       parameters at once. Points with a zero denominator keep their
+       parameter, results are clamped to [0, 1].
+    """
+    u = asarray(parameters, dtype=float)
+    q, qprime, qprimeprime = bezier.evalBatch(bez, u)
+    d = q - points
+    numerator = (d * qprime).sum(axis=1)
+    denominator = (qprime**2 + d * qprimeprime).sum(axis=1)
+    step = divide(numerator, denominator, out=zeros_like(u), where=denominator != 0.0)
+    return clip(u - step, 0.0, 1.0)
+
+
 def newtonRaphsonRootFind(bez, point, u):
     """
        Newton's root finding algorithm calculates f(x)=0 by reiterating
@@ -144,6 +635,13 @@ def chordLengthParameterize(points):
     return u
 
 
+def chordLengthParameterizeFast(points):
+    u = concatenate(([0.0], cumsum(linalg.norm(diff(points, axis=0), axis=1))))
+    if u[-1] == 0.0:
+        return linspace(0.0, 1.0, len(points))
+    return u / u[-1]
+
+
 def computeMaxError(points, bez, parameters):
     maxDist = 0.0
     splitPoint = len(points)/2
@@ -156,6 +654,19 @@ def computeMaxError(points, bez, parameters):
     return maxDist, splitPoint
 
 
+def computeMaxErrorFast(points, bez, parameters):
+    """
+       Same result as computeMaxError: all squared distances are computed
+       in one pass and the first maximum is taken as split point.
+    """
+    dist = ((bezier.qBatch(bez, parameters) - points)**2).sum(axis=1)
+    splitPoint = int(argmax(dist))
+    if not dist[splitPoint] > 0.0:
+        return 0.0, len(points) // 2
+
+    return dist[splitPoint], splitPoint
+
+
 def normalize(v):
     from numpy import linalg
     n = linalg.norm(v)
@@ -163,3 +674,61 @@ def normalize(v):
         return v * 0  # évite division par zéro
     return v / n
 
+
+
+if __name__ == "__main__":
+    # Parity check of the vectorized path against the reference implementation
+    random.seed(0)
+    theta = linspace(0, pi, 400)
+    pts = column_stack((300 * cos(theta), 180 * sin(theta))) + random.normal(0, 1.5, (400, 2))
+    lt = normalize(pts[1] - pts[0])
+    rt = normalize(pts[-2] - pts[-1])
+    u = chordLengthParameterize(pts)
+    for _ in range(3):
+        ref = generateBezier(pts, u, lt, rt)
+        fast = generateBezierFast(pts, u, lt, rt)
+        assert allclose(array(ref), fast), (ref, fast)
+        refError, refSplit = computeMaxError(pts, ref, u)
+        fastError, fastSplit = computeMaxErrorFast(pts, ref, u)
+        assert isclose(refError, fastError) and refSplit == fastSplit
+        uRef = reparameterize(ref, pts, u)
+        u = reparameterizeFast(ref, pts, u)
+        assert allclose(clip(uRef, 0.0, 1.0), u)
+    assert allclose(chordLengthParameterize(pts), chordLengthParameterizeFast(pts))
+    # Short, nearly straight span whose least-squares handles overshoot each
+    # other: both implementations must fall back to the tangent heuristic
+    short = array([[0.382, 1.822], [0.062, 1.16], [1.997, 1.21]])
+    sl, sr = array([0.99559742, 0.09373248]), array([-0.8588978, -0.51214702])
+    su = chordLengthParameterize(short)
+    ref = generateBezier(short, su, sl, sr)
+    assert allclose(array(ref), generateBezierFast(short, su, sl, sr))
+    assert allclose(ref[1], short[0] + sl * linalg.norm(short[-1] - short[0]) / 3)
+    for preset in PRESETS:
+        for earlyStop in (False, True):
+            recursive = fitCubic(pts, lt, rt, 3.0, earlyStop, preset)
+            iterative = fitCubicIterative(pts, lt, rt, 3.0, earlyStop, preset=preset)
+            assert len(recursive) == len(iterative) and all(allclose(a, b) for a, b in zip(recursive, iterative))
+    serialStats, parallelStats = [], {'spans': 0, 'iterations': 0}
+    serial = fitClosedCurves([pts], 3.0, cornerAngle=45.0, stats=serialStats)[0]
+    parallel = fitCurveParallel(pts, 3.0, closed=True, workers=2, minSpanPoints=32, cornerAngle=45.0, stats=parallelStats)
+    assert len(serial) == len(parallel) and all(array_equal(a, b) for a, b in zip(serial, parallel))
+    assert serialStats[0] == parallelStats
+    stats = []
+    batched = fitClosedCurves([pts, pts[::2] * 0.5, pts[::-1]], 3.0, stats=stats)
+    with tracing.traced("check") as trace:
+        fitClosedCurves([pts, pts[::2] * 0.5, pts[::-1]], 3.0)
+    assert len(stats) == 3 and sum([s['iterations'] for s in stats]) == trace.counters['fit_iterations']
+    single = [fitCurve(p, 3.0, closed=True) for p in (pts, pts[::2] * 0.5, pts[::-1])]
+    assert all(len(a) == len(b) and all(allclose(x, y) for x, y in zip(a, b)) for a, b in zip(batched, single))
+    # many small contours: same segments and per-contour counts as one by one
+    t = linspace(0, 2 * pi, 60, endpoint=False)
+    blobs = [column_stack(((8 + k % 7) * cos(t), (5 + k % 5) * sin(t))) + random.normal(0, 0.4, (60, 2)) + 40 * k
+             for k in range(200)]
+    stats = []
+    batched = fitClosedCurves(blobs, 3.0, stats=stats)
+    for blob, curve, counts in zip(blobs, batched, stats):
+        alone = {'spans': 0, 'iterations': 0}
+        single = fitCurveParallel(blob, 3.0, closed=True, workers=1, stats=alone)
+        assert len(curve) == len(single) and all(allclose(x, y) for x, y in zip(curve, single)) and counts == alone
+    print("generateBezierFast / computeMaxErrorFast / reparameterizeFast / fitCubicIterative / fitCurveParallel"
+          " / fitClosedCurves : OK")
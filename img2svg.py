@@ -1,81 +1,567 @@
 #!/usr/bin/env python3
 # coding: utf-8
 
+import argparse
+import os
+import re
+import sys
+import time
+from pathlib import Path
 import cv2
 import numpy as np
 # from shapely.geometry import Polygon
 import svgwrite
-from config import IMG_IN_DIR, SVG_OUT_DIR, DEBUG_DIR
-from fitCurves import fitCurve
+from config import IMG_IN_DIR, SVG_OUT_DIR, DEBUG_DIR, MANIFEST_PATH
+from fitCurves import fitClosedCurves, fitCurveParallel, PRESETS
+from buildcache import BuildCache
+from batch import run_batch, print_summary
+import bezier
+import contour
+import tracing
 import base64
 
 TOL = 15
 SEED_POINT = (20,20)
 DELTA = 5
 MAX_ERROR = 3  # tolérance du fit Bézier
+# pré-simplification RDP à SIMPLIFY * sqrt(MAX_ERROR) px avant le fit (0 : aucune, < 1) ; le fit
+# garde le reste du budget (fit_error), les anneaux encore au-delà de sqrt(MAX_ERROR) sont réajustés
+SIMPLIFY = 0.0
+FIT_PRESET = "production"  # ou "draft" (rapide), "archival" (moins de segments), voir fitCurves.PRESETS
+FIT_WORKERS = 1  # processus pour le fit d'un contour (fitCurveParallel), 1 : en série
+OUTLINES = "largest"  # ou "all" : tous les contours et leurs trous (voir segment_outlines)
+MIN_AREA_RATIO = 0.002  # mode "all" : aire minimale d'un contour / plus grand extérieur
+SEGMENTATION = "fast"  # ou "classic", "pyramid" (voir segment_fast, segment_pyramid)
+TARGET_MM = 42.0  # plus grande dimension de l'emporte-pièce
+PYRAMID_TOL_MM = 0.05  # précision visée pour la segmentation grossière
+CONTOUR = "subpixel"  # ou "pixel" : points entiers de findContours (voir contour.py)
+PREVIEW = "none"  # ou "link", "thumbnail" : SVG d'aperçu dans DEBUG_DIR (voir write_preview)
+PREVIEW_PX = 512  # plus grand côté de la miniature JPEG
+SVG_PRECISION = 2  # décimales des coordonnées du path (px)
 
-SVG_OUT_DIR.mkdir(parents=True, exist_ok=True)
-DEBUG_DIR.mkdir(parents=True, exist_ok=True)
+DEFAULT_PARAMS = {
+    "tol": TOL,
+    "seed_point": SEED_POINT,
+    "delta": DELTA,
+    "max_error": MAX_ERROR,
+    "fit_preset": FIT_PRESET,
+    "fit_workers": FIT_WORKERS,
+    "simplify": SIMPLIFY,
+    "simplify_gap": contour.GAP,
+    "segmentation": SEGMENTATION,
+    "outlines": OUTLINES,
+    "min_area_ratio": MIN_AREA_RATIO,
+    "target_mm": TARGET_MM,
+    "pyramid_tol_mm": PYRAMID_TOL_MM,
+    "contour": CONTOUR,
+    "contour_sigma": contour.SIGMA,
+    "contour_spacing": contour.SPACING,
+    "preview": PREVIEW,
+    "svg_precision": SVG_PRECISION,
+}
 
-# === MAIN ===
-for img_path in IMG_IN_DIR.glob("*"):
-    print(f"➡️ Traitement : {img_path.name}")
-    img = cv2.imread(str(img_path), cv2.IMREAD_COLOR)
+_TRAILING_ZEROS = re.compile(r"(\.\d*?[1-9])0+\b|\.0+\b")
+
+
+def svg_path_for(img_path):
+    return SVG_OUT_DIR / f"{img_path.stem}.svg"
+
+
+def image_to_beziers(img_path, params=DEFAULT_PARAMS):
+    """
+    Image -> contours en Bézier cubiques : liste d'anneaux fermés (N, 4, 2)
+    en px, chaque extérieur suivi de ses trous (un seul anneau en mode
+    outlines="largest"), et la taille (w, h) de l'image.
+    """
+    with tracing.stage("read"):
+        img = cv2.imread(str(img_path), cv2.IMREAD_COLOR)
     if img is None:
-        print(f"⚠️ Impossible de lire {img_path}")
-        continue
+        raise ValueError(f"Impossible de lire {img_path}")
 
     debug_path = DEBUG_DIR / f"{img_path.stem}.png"
-    out_svg = SVG_OUT_DIR / f"{img_path.stem}.svg"
+
+    h, w = img.shape[:2]
+    with tracing.stage("segmentation"):
+        rings = segment(img, params)
+    tracing.count("outlines", len(rings))
+
+    # Conversion vers Bézier avec fitCurves
+    with tracing.stage("contour"):
+        points = contour_points(rings, params)
+    original = None
+    if params["simplify"] > 0:
+        with tracing.stage("simplify"):
+            original, points = points, simplify_points(points, params)
+    with tracing.stage("fitCurve"):
+        beziers = fit_rings(points, params, original)
+    tracing.count("bezier_segments", sum(len(b) for b in beziers))
+    return beziers, (w, h)
+
+
+def segment(img, params=DEFAULT_PARAMS):
+    """
+    Image -> anneaux [(contour OpenCV, trou ?), ...], chaque extérieur suivi
+    de ses trous. outlines="all" a sa propre extraction plein format
+    (segment_outlines, masque de segment_fast) : seule la segmentation
+    "fast" y correspond, les autres sont refusées plutôt qu'ignorées.
+    """
+    if params["outlines"] == "all":
+        if params["segmentation"] != "fast":
+            raise ValueError(f"outlines='all' n'existe qu'avec segmentation='fast' (pas {params['segmentation']!r})")
+        return [(c, hole) for outer, holes in segment_outlines(img, params)
+                for c, hole in [(outer, False)] + [(h, True) for h in holes]]
+    return [(SEGMENTATIONS[params["segmentation"]](img, params), False)]
+
+
+def contour_points(rings, params=DEFAULT_PARAMS):
+    """Anneaux -> points (N, 2) float par anneau, sous-pixel ou entiers selon params["contour"]."""
+    if params["contour"] == "subpixel":
+        points = [contour.subpixel_contour(c, params["contour_sigma"], params["contour_spacing"], hole)
+                  for c, hole in rings]
+    else:
+        points = [np.array(c.reshape(-1, 2), dtype=float) for c, _ in rings]
+    tracing.count("contour_points", sum(len(p) for p in points))
+    return points
+
+
+def simplify_points(points, params=DEFAULT_PARAMS):
+    """
+    Pré-simplification de chaque anneau avant le fit (voir contour.presimplify).
+    Trace : points avant / après et leur rapport, par contour.
+    """
+    eps = params["simplify"] * np.sqrt(params["max_error"])  # max_error : écart au carré, px²
+    simplified = [contour.presimplify(p, eps, params["simplify_gap"]) for p in points]
+    for pts, kept in zip(points, simplified):
+        tracing.detail("simplify", {"points": len(pts), "kept": len(kept), "ratio": round(len(kept) / len(pts), 3)})
+    return simplified
+
+
+def fit_error(params=DEFAULT_PARAMS):
+    """
+    Tolérance (au carré) du fit des points simplifiés : max_error, moins la
+    part prise par la pré-simplification (eps px, voir simplify_points).
+    Garde la plupart des anneaux dans sqrt(max_error) de leurs points
+    d'origine ; fit_rings réajuste les autres.
+    """
+    if not 0 <= params["simplify"] < 1:
+        raise ValueError(f"simplify doit être dans [0, 1) (pas {params['simplify']!r})")
+    return (np.sqrt(params["max_error"]) * (1 - params["simplify"]))**2
+
+
+def max_deviation(pts, ring, samples=16, newton=3):
+    """
+    Majorant de l'écart au carré (px²) entre les points (N, 2) d'un anneau
+    fermé et les Bézier ring (M, 4, 2) qui l'ajustent. Chaque point est
+    rapporté au segment dont les extrémités l'encadrent (les extrémités sont
+    des points de l'anneau), parti du plus proche de samples points du
+    segment puis corrigé par quelques pas de Newton comme dans fitCurves :
+    la distance à un paramètre majore la distance à la courbe. Extrémité
+    introuvable : inf.
+    """
+    n = len(pts)
+    positions = {}
+    for i, p in enumerate(map(tuple, pts)):
+        positions.setdefault(p, []).append(i)
+    if not len(ring) or tuple(ring[0, 0]) not in positions:
+        return np.inf
+    origin = positions[tuple(ring[0, 0])][0]
+    offsets = [0]
+    for start in ring[1:, 0]:  # position de chaque début de segment, dans l'ordre du contour
+        later = [o for o in ((i - origin) % n for i in positions.get(tuple(start), [])) if o > offsets[-1]]
+        if not later:
+            return np.inf
+        offsets.append(min(later))
+    bounds = np.append(offsets, n)
+    lengths = np.diff(bounds) + 1
+    seg = np.repeat(np.arange(len(ring)), lengths)
+    local = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    p = pts[(bounds[seg] + local + origin) % n]
+    ctrl = ring[seg]
+
+    # départ : le plus proche de samples points du segment, puis pas de Newton (reparameterizeFast)
+    t = np.linspace(0.0, 1.0, samples)
+    along = np.einsum("tk,mkd->mtd", bezier.bernstein(t), ring)
+    u = t[((along[seg] - p[:, None])**2).sum(axis=2).argmin(axis=1)]
+    best = np.full(len(p), np.inf)
+    for _ in range(newton + 1):
+        q, d1, d2 = (np.einsum("mk,mkd->md", basis(u), ctrl)
+                     for basis in (bezier.bernstein, bezier.bernsteinPrime, bezier.bernsteinPrimePrime))
+        d = q - p
+        best = np.minimum(best, (d**2).sum(axis=1))
+        num = (d * d1).sum(axis=1)
+        den = (d1**2 + d * d2).sum(axis=1)
+        u = np.clip(u - np.divide(num, den, out=np.zeros_like(u), where=den != 0.0), 0.0, 1.0)
+    return best.max()
+
+
+def fit_rings(points, params=DEFAULT_PARAMS, original=None):
+    """
+    Points des anneaux -> Bézier (N, 4, 2) par anneau, tous ajustés en un
+    seul appel, ou chacun sur fit_workers processus si fit_workers > 1.
+    original : anneaux avant simplify_points. Les points simplifiés sont
+    alors ajustés à fit_error(params), et tout anneau dont un point
+    d'origine s'écarte de plus de sqrt(max_error) (max_deviation) est
+    réajusté sur ses points d'origine.
+    Trace : points, segments, spans et itérations par contour.
+    """
+    tracing.count("fit_points", sum(len(p) for p in points))
+    max_error = params["max_error"] if original is None else fit_error(params)
+    fitted, stats = _fit(points, max_error, params)
+    if original is not None:
+        redo = [i for i, (pts, ring) in enumerate(zip(original, fitted))
+                if not max_deviation(pts, ring) <= params["max_error"]]
+        tracing.count("simplify_refits", len(redo))
+        points = list(points)
+        for i, ring, counts in zip(redo, *_fit([original[i] for i in redo], params["max_error"], params)):
+            points[i], fitted[i] = original[i], ring
+            stats[i] = {k: stats[i][k] + counts[k] for k in counts}
+    for pts, ring, counts in zip(points, fitted, stats):
+        tracing.detail("contours", {"points": len(pts), "segments": len(ring), **counts})
+    return fitted
+
+
+def _fit(points, max_error, params):
+    """Ajustement des anneaux à max_error -> (Bézier sans NaN par anneau, compteurs par anneau)."""
+    stats = []
+    if params["fit_workers"] > 1:
+        # contour par contour, spans répartis sur un pool (gros contours uniques)
+        fitted = []
+        for pts in points:
+            stats.append({"spans": 0, "iterations": 0})
+            fitted.append(fitCurveParallel(pts, max_error, closed=True, workers=params["fit_workers"],
+                                           preset=params["fit_preset"], stats=stats[-1]))
+    else:
+        fitted = fitClosedCurves(points, max_error, preset=params["fit_preset"], stats=stats)
+    # Nettoyage des NaN dans beziers
+    beziers = [np.array([seg for seg in ring if not np.isnan(np.array(seg)).any()], dtype=float).reshape(-1, 4, 2)
+               for ring in fitted]
+    return beziers, stats
+
+
+def segment_classic(img, params=DEFAULT_PARAMS):
+    """Fond par floodFill + seuil, plus grand contour nettoyé (-delta / +delta px)."""
+    tol, delta = params["tol"], params["delta"]
 
     # Nettoyage du fond et création image binaire
     h, w = img.shape[:2]
     mask = np.zeros((h+2, w+2), np.uint8)
-    cv2.floodFill(img, mask, SEED_POINT, (255, 255, 255), (TOL, TOL, TOL), (TOL, TOL, TOL))
+    cv2.floodFill(img, mask, params["seed_point"], (255, 255, 255), (tol, tol, tol), (tol, tol, tol))
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     _, binary = cv2.threshold(gray, 250, 255, cv2.THRESH_BINARY_INV)
 
     # Recherche contour principal sur image binaire
     contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     if not contours:
-        print(f"⚠️ Pas de contour trouvé {img_path}")
-        continue
+        raise ValueError("Pas de contour trouvé")
     largest = max(contours, key=cv2.contourArea)
 
     # Repassage par un bitmap pour nettoyer les points solitaire -Delta px + Delta px
     mask = np.zeros_like(binary)
     cv2.drawContours(mask, [largest], -1, 255, -1)
-    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (DELTA, DELTA))
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (delta, delta))
     mask = cv2.erode(mask, kernel)
     mask = cv2.dilate(mask, kernel)
 
     contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     if not contours:
-        print(f"⚠️ Aucun contour re-trouvé pour {img_path}")
-        continue
-    largest = contours[0]
+        raise ValueError("Aucun contour re-trouvé")
+    return contours[0]
+
+
+# Tampons de segment_fast réutilisés d'une image à l'autre (par processus),
+# pour la dernière taille d'image seulement : un lot de photos de tailles
+# variées ne garde pas ~3 octets / px par taille rencontrée
+_BUFFERS = {}
 
-    # Conversion vers Bézier avec fitCurves
-    ptsfloat = np.array(largest.reshape(-1, 2), dtype=float)
-    beziers = fitCurve(ptsfloat, MAX_ERROR)
-    # Nettoyage des NaN dans beziers
-    beziers = [seg for seg in beziers if not np.isnan(np.array(seg)).any()]
 
-    path_data = ""
-    for seg in beziers:
-        p0, c1, c2, p3 = seg  # points du segment Bézier cubique
-        if not path_data:
-            path_data += f"M {p0[0]},{p0[1]} "
-        path_data += f"C {c1[0]},{c1[1]} {c2[0]},{c2[1]} {p3[0]},{p3[1]} "
-    path_data += "Z"  # fermer le chemin
+def _buffers(h, w):
+    buf = _BUFFERS.get((h, w))
+    if buf is None:
+        _BUFFERS.clear()
+        buf = _BUFFERS[(h, w)] = {
+            "flood": np.empty((h+2, w+2), np.uint8),
+            "gray": np.empty((h, w), np.uint8),
+            "binary": np.empty((h, w), np.uint8),
+        }
+    return buf
 
-    with open(img_path, "rb") as f:
-        b64 = base64.b64encode(f.read()).decode()
-    href = f"data:image/png;base64,{b64}"
 
-    dwg = svgwrite.Drawing(str(out_svg), size=(w, h))
+def background_mask(img, params=DEFAULT_PARAMS):
+    """
+    Fond (255) relié à seed_point : masque (h+2, w+2) d'un floodFill en
+    masque seul, l'image n'est pas repeinte. Tampon réutilisé.
+    """
+    tol = params["tol"]
+    flood = _buffers(*img.shape[:2])["flood"]
+    flood.fill(0)
+    flags = 4 | cv2.FLOODFILL_MASK_ONLY | (255 << 8)
+    cv2.floodFill(img, flood, params["seed_point"], 0, (tol, tol, tol), (tol, tol, tol), flags)
+    return flood
+
+
+def object_mask(img, params=DEFAULT_PARAMS):
+    """
+    Image binaire (255 = objet) : pas fond et gris <= 250. Le fond
+    (background_mask) est retiré du seuillage par une soustraction saturée.
+    Tampon réutilisé.
+    """
+    buf = _buffers(*img.shape[:2])
+    flood = background_mask(img, params)
+    cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=buf["gray"])
+    cv2.threshold(buf["gray"], 250, 255, cv2.THRESH_BINARY_INV, dst=buf["binary"])
+    return cv2.subtract(buf["binary"], flood[1:-1, 1:-1], dst=buf["binary"])
+
+
+def segment_fast(img, params=DEFAULT_PARAMS):
+    """
+    Même résultat que segment_classic, en moins de passes plein format :
+    - floodFill en masque seul (l'image n'est pas repeinte), le fond est
+      retiré du seuillage par une soustraction saturée ;
+    - un seul findContours plein format, puis remplissage, nettoyage et
+      contour final uniquement dans la boîte englobante du plus grand ;
+    - tampons plein format réutilisés pour les images de même taille.
+    """
+    delta = params["delta"]
+    h, w = img.shape[:2]
+    binary = object_mask(img, params)
+
+    # Recherche contour principal sur image binaire
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        raise ValueError("Pas de contour trouvé")
+    largest = max(contours, key=cv2.contourArea)
+
+    # ROI avec une marge de delta px : l'érosion / dilatation n'atteint pas ses bords
+    x, y, bw, bh = cv2.boundingRect(largest)
+    x0, y0 = max(x - delta, 0), max(y - delta, 0)
+    x1, y1 = min(x + bw + delta, w), min(y + bh + delta, h)
+    roi = np.zeros((y1 - y0, x1 - x0), np.uint8)
+    cv2.drawContours(roi, [largest], -1, 255, -1, offset=(-x0, -y0))
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (delta, delta))
+    cv2.morphologyEx(roi, cv2.MORPH_OPEN, kernel, dst=roi)
+
+    contours, _ = cv2.findContours(roi, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(x0, y0))
+    if not contours:
+        raise ValueError("Aucun contour re-trouvé")
+    return contours[0]
+
+
+def pyramid_factor(shape, params=DEFAULT_PARAMS):
+    """Plus grande réduction 2**k gardant target_mm / pyramid_tol_mm px sur l'image."""
+    need = params["target_mm"] / params["pyramid_tol_mm"]
+    factor = 1
+    while max(shape[:2]) / (2 * factor) >= need:
+        factor *= 2
+    return factor
+
+
+def segment_pyramid(img, params=DEFAULT_PARAMS):
+    """
+    Segmentation grossière puis affinage pleine résolution.
+    L'image est sous-échantillonnée (pyramid_factor) et détourée avec
+    segment_fast ; le contour obtenu, remis à l'échelle, ne sert qu'à
+    délimiter une bande étroite autour du bord. Seule cette bande est
+    re-classée en pleine résolution : floodFill du fond limité à la bande
+    (même tolérance flottante que le floodFill d'origine), amorcé sur le
+    bord extérieur de la bande là où le floodFill grossier a trouvé du
+    fond, et seuil de gris. L'intérieur de la bande est repris tel quel.
+    """
+    tol, delta = params["tol"], params["delta"]
+    h, w = img.shape[:2]
+    f = pyramid_factor(img.shape, params)
+    if f == 1:
+        return segment_fast(img, params)
+
+    # sous-échantillonnage simple (vue) : suffisant pour un détourage grossier
+    small = np.ascontiguousarray(img[f // 2::f, f // 2::f])
+    sx, sy = params["seed_point"]
+    small_params = {**params, "seed_point": (sx // f, sy // f), "delta": max(1, delta // f)}
+    coarse = segment_fast(small, small_params)
+    outline = coarse * f + f // 2
+    # fond grossier (relié au point de départ), érodé d'un pixel : sûr à l'échelle 1/f
+    background = cv2.erode(background_mask(small, small_params)[1:-1, 1:-1], np.ones((3, 3), np.uint8))
+
+    # ROI pleine résolution autour du contour grossier, bande de +/- r px
+    # tracée directement comme un trait épais le long du contour
+    r = 2 * f
+    margin = r + delta + 1
+    x, y, bw, bh = cv2.boundingRect(outline)
+    x0, y0 = max(x - margin, 0), max(y - margin, 0)
+    x1, y1 = min(x + bw + margin, w), min(y + bh + margin, h)
+    roi = img[y0:y1, x0:x1]
+    mask = np.zeros(roi.shape[:2], np.uint8)
+    band = np.zeros(roi.shape[:2], np.uint8)
+    cv2.drawContours(mask, [outline], -1, 255, -1, offset=(-x0, -y0))
+    cv2.drawContours(band, [outline], -1, 255, 2 * r + 1, offset=(-x0, -y0))
+    mask[band > 0] = 0  # intérieur sûr
+
+    # Fond dans la bande : floodFill depuis le bord extérieur de la bande,
+    # le reste de l'image est bloqué par le masque (255), le fond marqué 128
+    flood = np.full((y1 - y0 + 2, x1 - x0 + 2), 255, np.uint8)
+    flood[1:-1, 1:-1] = 255 - band
+    flags = 4 | cv2.FLOODFILL_MASK_ONLY | (128 << 8)
+    edges, _ = cv2.findContours(cv2.bitwise_or(band, mask), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    seeds = np.concatenate([e.reshape(-1, 2) for e in edges])
+    # seuls les bords classés fond par le floodFill grossier amorcent un remplissage,
+    # et s'ils ont la couleur de ce fond grossier local (un détail fin de l'objet
+    # peut manquer à l'échelle 1/f) : pas de comparaison au seul point de départ,
+    # le fond peut en avoir dérivé de plus de tol (vignettage)
+    cy = np.clip((seeds[:, 1] + y0) // f, 0, background.shape[0] - 1)
+    cx = np.clip((seeds[:, 0] + x0) // f, 0, background.shape[1] - 1)
+    local = np.abs(roi[seeds[:, 1], seeds[:, 0]].astype(np.int16) - small[cy, cx]) <= tol
+    seeds = seeds[(background[cy, cx] > 0) & local.all(axis=1)]
+    while len(seeds):
+        cv2.floodFill(roi, flood, (int(seeds[0, 0]), int(seeds[0, 1])), 0, (tol, tol, tol), (tol, tol, tol), flags)
+        seeds = seeds[flood[seeds[:, 1] + 1, seeds[:, 0] + 1] == 0]
+
+    # Pixels de la bande : objet si pas fond et gris <= 250
+    ys, xs = np.nonzero(band)
+    gray = roi[ys, xs] @ np.array([0.114, 0.587, 0.299])
+    keep = (flood[ys + 1, xs + 1] != 128) & (gray <= 250.5)
+    mask[ys[keep], xs[keep]] = 255
+
+    # Repassage par un bitmap pour nettoyer les points solitaire -Delta px + Delta px
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (delta, delta))
+    cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel, dst=mask)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(x0, y0))
+    if not contours:
+        raise ValueError("Aucun contour re-trouvé")
+    return max(contours, key=cv2.contourArea)
+
+
+def segment_outlines(img, params=DEFAULT_PARAMS):
+    """
+    Tous les contours de l'objet (masque de object_mask, nettoyé par
+    ouverture -delta / +delta px) : extérieurs et trous par RETR_CCOMP,
+    -> [(extérieur, [trous]), ...], plus grande aire d'abord. Les contours
+    d'aire < min_area_ratio * plus grand extérieur sont écartés ici, avant
+    tout fit : une photo bruitée peut en compter des centaines.
+    """
+    binary = object_mask(img, params)
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (params["delta"], params["delta"]))
+    cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel, dst=binary)
+    contours, hierarchy = cv2.findContours(binary, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        raise ValueError("Pas de contour trouvé")
+    parent = hierarchy[0, :, 3]
+    areas = np.array([cv2.contourArea(c) for c in contours])
+    keep = areas >= params["min_area_ratio"] * areas[parent < 0].max()
+    outers = [i for i in np.argsort(-areas, kind="stable") if parent[i] < 0 and keep[i]]
+    return [(contours[i], [contours[j] for j in np.flatnonzero((parent == i) & keep)]) for i in outers]
+
+
+SEGMENTATIONS = {"classic": segment_classic, "fast": segment_fast, "pyramid": segment_pyramid}
+
+
+def path_data(rings, precision=SVG_PRECISION, relative=True):
+    """Anneaux (N, 4, 2) -> attribut d d'un path SVG, un sous-chemin fermé par anneau."""
+    return " ".join(ring_data(beziers, precision, relative) for beziers in rings)
+
+
+def ring_data(beziers, precision=SVG_PRECISION, relative=True):
+    """
+    Contour (N, 4, 2) -> sous-chemin SVG fermé, formaté en une passe.
+    Coordonnées arrondies à precision décimales ; en relatif (c), chaque
+    segment est exprimé depuis l'extrémité arrondie du précédent, donc sans
+    dérive d'arrondi, et son point de départ n'est plus répété.
+    """
+    pts = np.round(np.asarray(beziers, dtype=float), precision)
+    if relative:
+        current = np.concatenate([pts[:1, 0], pts[:-1, 3]])
+        pts = np.round(pts[:, 1:] - current[:, None], precision)
+    else:
+        pts = pts[:, 1:]
+    cmd = "c" if relative else "C"
+    num = f"%.{precision}f"
+    body = (f" {cmd}{num},{num} {num},{num} {num},{num}" * len(pts)) % tuple((pts + 0.0).ravel())
+    head = f"M{num},{num}" % tuple(np.round(beziers[0][0], precision) + 0.0)
+    text = head + body + " Z"
+    if precision > 0:
+        text = _TRAILING_ZEROS.sub(r"\1", text)  # 1.50 -> 1.5, 2.00 -> 2
+    return text
+
+
+def write_svg(out_svg, rings, size, precision=SVG_PRECISION):
+    """SVG de production : uniquement les contours (anneaux (N, 4, 2), un seul path), sans image."""
+    w, h = size
+    dwg = svgwrite.Drawing(str(out_svg), size=(w, h), debug=False)
+    dwg.add(dwg.path(d=path_data(rings, precision), stroke="blue", fill="none", stroke_width=0.4))
+    dwg.save()
+
+
+def preview_path_for(img_path):
+    return DEBUG_DIR / f"{img_path.stem}_preview.svg"
+
+
+def write_preview(out_svg, rings, img_path, size, mode=PREVIEW):
+    """
+    SVG d'aperçu : le contour par-dessus l'image source.
+    mode "link" : image référencée par chemin relatif (rien n'est recopié) ;
+    mode "thumbnail" : miniature JPEG (PREVIEW_PX px max) intégrée en base64.
+    """
+    w, h = size
+    if mode == "link":
+        href = Path(os.path.relpath(Path(img_path).resolve(), Path(out_svg).resolve().parent)).as_posix()
+    else:
+        img = cv2.imread(str(img_path), cv2.IMREAD_COLOR)
+        scale = PREVIEW_PX / max(w, h)
+        if scale < 1:
+            img = cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+        ok, jpg = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        if not ok:
+            raise ValueError(f"Miniature impossible pour {img_path}")
+        href = f"data:image/jpeg;base64,{base64.b64encode(jpg).decode()}"
+
+    dwg = svgwrite.Drawing(str(out_svg), size=(w, h), debug=False)
     dwg.add(dwg.image(href=href, insert=(0, 0), size=(w, h)))
-    dwg.add(dwg.path(d=path_data, stroke="blue", fill="none", stroke_width=0.4))
+    dwg.add(dwg.path(d=path_data(rings), stroke="blue", fill="none", stroke_width=0.4))
     dwg.save()
 
-    print(f"✅ SVG généré : {out_svg}")
+
+def process_image(img_path, params=DEFAULT_PARAMS):
+    """Image -> SVG (contours en Bézier), renvoie le chemin du SVG."""
+    out_svg = svg_path_for(img_path)
+    rings, size = image_to_beziers(img_path, params)
+    with tracing.stage("svg"):
+        write_svg(out_svg, rings, size, params["svg_precision"])
+        if params["preview"] != "none":
+            write_preview(preview_path_for(img_path), rings, img_path, size, params["preview"])
+    return out_svg
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Images -> SVG (contour en Bézier)")
+    parser.add_argument("images", nargs="*", type=Path, help=f"images à traiter (défaut : {IMG_IN_DIR}/*)")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="nombre de processus en parallèle")
+    parser.add_argument("--force", action="store_true", help="reconstruit tout sans tenir compte du cache")
+    parser.add_argument("--trace", type=Path, help="trace JSON lines (étapes, compteurs) par image")
+    parser.add_argument("--profile", type=Path, help="dossier des profils cProfile par image")
+    parser.add_argument("--preset", choices=PRESETS, default=FIT_PRESET, help="compromis vitesse / nombre de segments du fit")
+    parser.add_argument("--fit-workers", type=int, default=FIT_WORKERS, help="processus pour le fit de chaque contour (gros contours ; plutôt avec --jobs 1)")
+    parser.add_argument("--simplify", type=float, default=SIMPLIFY, help="pré-simplification (fraction de sqrt(max_error) dans [0, 1), 0 : aucune ; > 0 : fit plus rapide, même écart max au contour)")
+    parser.add_argument("--outlines", choices=("largest", "all"), default=OUTLINES, help="plus grand contour ou tous (trous compris, segmentation fast uniquement)")
+    parser.add_argument("--segmentation", choices=SEGMENTATIONS, default=SEGMENTATION, help="méthode de détourage")
+    parser.add_argument("--preview", choices=("none", "link", "thumbnail"), default=PREVIEW, help=f"écrit aussi un SVG d'aperçu dans {DEBUG_DIR}")
+    parser.add_argument("--contour", choices=("subpixel", "pixel"), default=CONTOUR, help="points du contour passés à fitCurve")
+    args = parser.parse_args(argv)
+    if args.outlines == "all" and args.segmentation != "fast":
+        parser.error("--outlines all n'existe qu'avec --segmentation fast")
+    if not 0 <= args.simplify < 1:
+        parser.error("--simplify doit être dans [0, 1)")
+
+    SVG_OUT_DIR.mkdir(parents=True, exist_ok=True)
+    DEBUG_DIR.mkdir(parents=True, exist_ok=True)
+
+    images = args.images or sorted(IMG_IN_DIR.glob("*"))
+    start = time.perf_counter()
+    cache = BuildCache(MANIFEST_PATH, "img2svg", force=args.force)
+    params = {**DEFAULT_PARAMS, "fit_preset": args.preset, "fit_workers": args.fit_workers, "simplify": args.simplify, "segmentation": args.segmentation, "outlines": args.outlines, "contour": args.contour, "preview": args.preview}
+    if args.profile:
+        args.profile.mkdir(parents=True, exist_ok=True)
+    reports = run_batch(process_image, images, params, args.jobs, cache, svg_path_for, args.trace, args.profile)
+    print_summary(reports, time.perf_counter() - start)
+    return 0 if all(r["status"] != "error" for r in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
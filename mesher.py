@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Maillage direct de la paroi en escalier de l'emporte-pièce.
+
+Au lieu d'extruder chaque anneau puis de concaténer des solides qui se
+chevauchent, on construit un seul solide étanche à partir des contours :
+base (cavité) puis contours dilatés d'offset croissant et de hauteur
+décroissante. Chaque contour existe à deux niveaux z, partagés entre sa
+paroi verticale et les faces planes (dessus à z = 0, marches en dessous).
+
+                 z = 0  ┌────────────────────┐
+                        │ base   │ 1 │ 3 │ 5 │
+                 -h5    │        │   │   └───┘
+                 -h3    │        │   └───┘
+                 -h1    │        └───┘
+"""
+
+import numpy as np
+import mapbox_earcut as earcut
+from shapely.geometry import Point, Polygon
+from shapely.geometry.polygon import orient
+
+
+def clean_ring(ring, eps=1e-9):
+    """Anneau (N, 2) sans point de fermeture -> sans doublons ni sommets alignés."""
+    while len(ring) > 3:
+        prev, nxt = np.roll(ring, 1, axis=0), np.roll(ring, -1, axis=0)
+        a, b = ring - prev, nxt - ring
+        cross = np.abs(a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0])
+        scale = np.hypot(*a.T) * np.hypot(*b.T)
+        drop = (scale <= eps * eps) | ((cross <= eps * scale) & ((a * b).sum(axis=1) > 0))
+        if not drop.any():
+            break
+        ring = ring[~drop]
+    return ring
+
+
+def oriented_rings(geom):
+    """Extérieurs (sens trigo) et trous (sens horaire), sans point de fermeture."""
+    polys = [geom] if isinstance(geom, Polygon) else list(geom.geoms)
+    exteriors, holes = [], []
+    for poly in polys:
+        poly = orient(poly, 1.0)
+        exteriors.append(clean_ring(np.asarray(poly.exterior.coords)[:-1, :2]))
+        holes += [clean_ring(np.asarray(r.coords)[:-1, :2]) for r in poly.interiors]
+    return exteriors, holes
+
+
+def triangulate(pts, ends):
+    """
+    Triangulation earcut (M, 3) d'un polygone à trous, triangles dans le sens
+    trigo. Earcut omet les triangles d'aire nulle (sommet d'un anneau aligné
+    sur l'arête d'un autre, ex. base carrée et son offset) : les boucles
+    d'arêtes laissées ouvertes sont refermées par des triangles plats, pour
+    que chaque arête intérieure reste partagée par deux faces.
+    """
+    tri = earcut.triangulate_float64(pts, ends).reshape(-1, 3).astype(np.int64)
+    p = pts[tri]
+    u, v = p[:, 1] - p[:, 0], p[:, 2] - p[:, 0]
+    area = u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]
+    tri[area < 0] = tri[area < 0][:, ::-1]
+
+    # arêtes des anneaux (une face) et arêtes intérieures (deux faces, sens opposés)
+    starts = np.concatenate([[0], ends[:-1]]).astype(np.int64)
+    ring = {}
+    for a, b in zip(starts, ends.astype(np.int64)):
+        i = np.arange(a, b)
+        ring.update((frozenset(e), 0) for e in zip(i, np.roll(i, -1)))
+    half = {}
+    for t in tri:
+        for a, b in ((t[0], t[1]), (t[1], t[2]), (t[2], t[0])):
+            half[a, b] = half.get((a, b), 0) + 1
+    # arêtes ouvertes : demi-arête intérieure sans opposée, arête d'anneau non couverte
+    missing = {}  # a -> b : demi-arête à ajouter
+    for (a, b), n in half.items():
+        if n > 1:
+            raise ValueError("triangulation incomplète")
+        if frozenset((a, b)) in ring:
+            ring[frozenset((a, b))] = 1
+        elif (b, a) not in half:
+            missing[b] = a
+    uncovered = [tuple(e) for e, n in ring.items() if not n]
+    if not missing and not uncovered:
+        return tri
+    # arêtes d'anneau non couvertes : sens imposé par la boucle qui les contient
+    loose = {}
+    for a, b in uncovered:
+        loose.setdefault(a, []).append(b)
+        loose.setdefault(b, []).append(a)
+    extra = []
+    while missing:
+        start, b = missing.popitem()
+        loop = [start]
+        while b != start:
+            loop.append(b)
+            if b in missing:
+                b = missing.pop(b)
+            elif loose.get(b):
+                c = loose[b].pop()
+                loose[c].remove(b)
+                b = c
+            else:
+                raise ValueError("triangulation incomplète")
+        extra += [(loop[0], loop[k], loop[k + 1]) for k in range(1, len(loop) - 1)]
+    if any(loose.values()):
+        raise ValueError("triangulation incomplète")
+    return np.vstack([tri, np.array(extra, dtype=np.int64).reshape(-1, 3)])
+
+
+def is_closed(faces):
+    """Chaque arête orientée a exactement une opposée : surface fermée, orientée."""
+    edges = faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+    n = int(faces.max()) + 1
+    forward, counts = np.unique(edges[:, 0] * n + edges[:, 1], return_counts=True)
+    backward = np.sort(edges[:, 1] * n + edges[:, 0])
+    return bool((counts == 1).all()) and np.array_equal(forward, backward)
+
+
+def _cap_polygons(outers, holes):
+    """Associe chaque trou au plus petit extérieur qui le contient -> [(outer, [holes])]."""
+    shapes = [Polygon(ring) for ring, _ in outers]
+    groups = [(outer, []) for outer in outers]
+    for hole in holes:
+        p = Point(hole[0][0])
+        inside = [i for i, s in enumerate(shapes) if s.contains(p)]
+        if not inside:
+            raise ValueError("trou hors de tout contour")
+        groups[min(inside, key=lambda i: shapes[i].area)][1].append(hole)
+    return groups
+
+
+def stepped_wall(base, outlines, heights):
+    """
+    Solide en escalier : outlines triés par offset croissant (chacun contient
+    strictement le précédent), heights strictement décroissantes (mm, > 0).
+    Renvoie (vertices (V, 3), faces (F, 3)), normales vers l'extérieur.
+    """
+    levels = [base] + list(outlines)
+    heights = list(heights)
+    # niveaux (haut, bas) de chaque contour : la base va de 0 à -h1,
+    # le contour i de -h(i+1) à -h(i), le dernier remonte jusqu'à 0
+    z_top = [0.0] + [-h for h in heights[1:]] + [0.0]
+    z_bottom = [-heights[0]] + [-h for h in heights]
+
+    rings = [oriented_rings(geom) for geom in levels]
+    sizes = [sum(len(r) for r in ext + holes) for ext, holes in rings]
+    n_vertices = 2 * sum(sizes)
+
+    # sommets : pour chaque contour, bloc du haut puis bloc du bas
+    vertices = np.empty((n_vertices, 3))
+    ring_ids = []  # par contour : [(anneau 2D, ids haut, ids bas, est_exterieur)]
+    start = 0
+    for level, (exteriors, holes) in enumerate(rings):
+        ids = []
+        offset = start
+        for k, ring in enumerate(exteriors + holes):
+            top = np.arange(offset, offset + len(ring))
+            bottom = top + sizes[level]
+            vertices[top, :2] = ring
+            vertices[top, 2] = z_top[level]
+            vertices[bottom, :2] = ring
+            vertices[bottom, 2] = z_bottom[level]
+            ids.append((ring, top, bottom, k < len(exteriors)))
+            offset += len(ring)
+        ring_ids.append(ids)
+        start += 2 * sizes[level]
+
+    # faces planes : dessus (z = 0, base -> dernier contour), puis une marche
+    # sous chaque contour (contour i -> contour i-1)
+    caps = [(ring_ids[-1], 1, ring_ids[0], 1, 1.0)]
+    caps += [(ring_ids[i], 2, ring_ids[i - 1], 2 if i == 1 else 1, -1.0) for i in range(1, len(levels))]
+
+    cap_polygons = []
+    for outer_ids, outer_z, inner_ids, inner_z, normal in caps:
+        # anneaux (2D, ids au bon niveau) : extérieurs de A et trous de B d'un côté,
+        # trous de A et extérieurs de B de l'autre
+        a = [(r[0], r[outer_z]) for r in outer_ids]
+        b = [(r[0], r[inner_z]) for r in inner_ids]
+        outers = [ring for ring, r in zip(a, outer_ids) if r[3]] + [ring for ring, r in zip(b, inner_ids) if not r[3]]
+        holes = [ring for ring, r in zip(a, outer_ids) if not r[3]] + [ring for ring, r in zip(b, inner_ids) if r[3]]
+        cap_polygons += [(outer, group, normal) for outer, group in _cap_polygons(outers, holes)]
+
+    # nombre de triangles connu d'avance : parois 2 par arête, faces planes
+    # n + 2 * trous - 2 par polygone (earcut n'ajoute pas de sommet)
+    n_faces = 2 * sum(sizes)
+    n_faces += sum(len(o[0]) + sum(len(h[0]) for h in hs) + 2 * len(hs) - 2 for o, hs, _ in cap_polygons)
+    faces = np.empty((n_faces, 3), dtype=np.int64)
+
+    # parois verticales, normale à droite du sens de parcours : vers
+    # l'extérieur pour les contours dilatés, retournée pour la cavité
+    f = 0
+    for level, ids in enumerate(ring_ids):
+        for ring, top, bottom, _ in ids:
+            n = len(ring)
+            bottom_next, top_next = np.roll(bottom, -1), np.roll(top, -1)
+            wall = faces[f:f + 2 * n]
+            wall[:n] = np.column_stack((bottom, bottom_next, top_next))
+            wall[n:] = np.column_stack((bottom, top_next, top))
+            if level == 0:
+                wall[:] = wall[:, ::-1]
+            f += 2 * n
+
+    for (outer, outer_ids), holes, normal in cap_polygons:
+        ring_list = [outer] + [h[0] for h in holes]
+        ids = np.concatenate([outer_ids] + [h[1] for h in holes])
+        ends = np.cumsum([len(r) for r in ring_list]).astype(np.uint32)
+        tri = triangulate(np.concatenate(ring_list), ends)
+        if len(tri) != len(ids) + 2 * len(holes) - 2:
+            raise ValueError("triangulation incomplète")
+        # orientation : normale +z pour le dessus, -z pour les marches
+        tri = ids[tri] if normal > 0 else ids[tri[:, ::-1]]
+        faces[f:f + len(tri)] = tri
+        f += len(tri)
+
+    if not is_closed(faces):
+        raise ValueError("maillage non étanche")
+    return vertices, faces
+
+
+if __name__ == "__main__":
+    # Contrôle : solide fermé et volume attendu, y compris sur des contours à
+    # bords droits (sommets alignés entre la base et ses offsets)
+    from shapely.geometry import box
+    offsets, heights = (1.0, 3.2, 5.6), (16.8, 6.0, 3.8)
+    shapes = {
+        "carré": Polygon([(0, 0), (40, 0), (40, 40), (0, 40)]),
+        "rectangle": box(0, 0, 42, 20),
+        "disque": Point(0, 0).buffer(20),
+        "carré percé": box(0, 0, 42, 42).difference(box(10, 10, 30, 30)),
+        "L": Polygon([(0, 0), (42, 0), (42, 10), (10, 10), (10, 42), (0, 42)]),
+    }
+    for name, base in shapes.items():
+        outlines = [base.buffer(o) for o in offsets]
+        vertices, faces = stepped_wall(base, outlines, heights)
+        assert is_closed(faces), name
+        p = vertices[faces]
+        volume = np.einsum("ij,ij->i", p[:, 0], np.cross(p[:, 1], p[:, 2])).sum() / 6
+        areas = [base.area] + [o.area for o in outlines]
+        expected = sum((areas[i + 1] - areas[i]) * h for i, h in enumerate(heights))
+        assert np.isclose(volume, expected, rtol=1e-9), (name, volume, expected)
+    print("stepped_wall : " + " / ".join(shapes) + " : OK")
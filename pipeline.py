@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Image -> STL en un seul passage : les Bézier ajustées par img2svg sont
+passées directement (tableau (N, 4, 2)) à l'étape polygone / extrusion de
+svg2stl, sans formatage texte ni relecture svgpathtools. Le SVG n'est
+plus qu'un artefact optionnel (--svg).
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from config import IMG_IN_DIR, SVG_OUT_DIR, DEBUG_DIR, STL_OUT_DIR, MANIFEST_PATH
+from buildcache import BuildCache
+from batch import StageTimer, run_batch, print_summary
+import img2svg
+import svg2stl
+
+DEFAULT_PARAMS = {**img2svg.DEFAULT_PARAMS, **svg2stl.DEFAULT_PARAMS, "write_svg": False}
+
+
+def image_to_stl(img_path, out_path, params=DEFAULT_PARAMS, svg_path=None):
+    """Image -> STL, écrit aussi le SVG si svg_path est donné. Renvoie les temps par étape."""
+    timer = StageTimer()
+    rings, size = img2svg.image_to_beziers(img_path, params)
+    timer.lap("fit")
+    if svg_path is not None:
+        img2svg.write_svg(svg_path, rings, size, params["svg_precision"])
+        timer.lap("svg")
+    return svg2stl.beziers_to_stl(rings, out_path, params, timer)
+
+
+def stl_path_for(img_path):
+    return STL_OUT_DIR / f"{img_path.stem}.stl"
+
+
+def process_image(img_path, params=DEFAULT_PARAMS):
+    svg_path = img2svg.svg_path_for(img_path) if params["write_svg"] else None
+    return image_to_stl(img_path, stl_path_for(img_path), params, svg_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Images -> STL d'emporte-pièce (sans passer par le SVG)")
+    parser.add_argument("images", nargs="*", type=Path, help=f"images à traiter (défaut : {IMG_IN_DIR}/*)")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="nombre de processus en parallèle")
+    parser.add_argument("--svg", action="store_true", help=f"écrit aussi le SVG dans {SVG_OUT_DIR}")
+    parser.add_argument("--force", action="store_true", help="reconstruit tout sans tenir compte du cache")
+    parser.add_argument("--fit-workers", type=int, default=img2svg.FIT_WORKERS, help="processus pour le fit de chaque contour (gros contours ; plutôt avec --jobs 1)")
+    parser.add_argument("--summary", type=Path, help="écrit le bilan du lot en JSON")
+    parser.add_argument("--trace", type=Path, help="trace JSON lines (étapes, compteurs) par image")
+    parser.add_argument("--profile", type=Path, help="dossier des profils cProfile par image")
+    args = parser.parse_args(argv)
+
+    for d in (SVG_OUT_DIR, DEBUG_DIR, STL_OUT_DIR):
+        d.mkdir(parents=True, exist_ok=True)
+    if args.profile:
+        args.profile.mkdir(parents=True, exist_ok=True)
+
+    params = {**DEFAULT_PARAMS, "write_svg": args.svg, "fit_workers": args.fit_workers}
+    images = args.images or sorted(IMG_IN_DIR.glob("*"))
+    cache = BuildCache(MANIFEST_PATH, "pipeline", force=args.force)
+    start = time.perf_counter()
+    reports = run_batch(process_image, images, params, args.jobs, cache, stl_path_for, args.trace, args.profile)
+    print_summary(reports, time.perf_counter() - start, args.summary)
+    return 0 if all(r["status"] != "error" for r in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
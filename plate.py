@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Plateau d'impression : plusieurs emporte-pièces dans un seul STL.
+
+L'empreinte au sol de chaque emporte-pièce (contour le plus dilaté) est
+placée sur le plateau par une heuristique « en bas à gauche » : positions
+candidates contre les boîtes englobantes déjà posées, test de collision au
+niveau des polygones. Les voisins sont cherchés dans une grille régulière
+(index spatial incrémental), pas par comparaison deux à deux.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from shapely import affinity
+from shapely.prepared import prep
+from config import SVG_IN_DIR, STL_OUT_DIR
+from batch import StageTimer, run_batch, print_summary
+from stlwriter import StlWriter
+import svg2stl
+
+BED = (220.0, 220.0)  # mm
+SPACING = 2.0  # écart minimal entre deux empreintes, mm
+EPS = 1e-6  # mm : les positions candidates sont à spacing pile des empreintes posées
+CELL = 20.0  # taille des cellules de la grille, mm
+
+
+class GridIndex:
+    """Index spatial : cellule (i, j) -> éléments dont la boîte la recouvre."""
+
+    def __init__(self, cell=CELL):
+        self.cell = cell
+        self.cells = {}
+
+    def _cells(self, bounds):
+        xmin, ymin, xmax, ymax = bounds
+        for i in range(int(xmin // self.cell), int(xmax // self.cell) + 1):
+            for j in range(int(ymin // self.cell), int(ymax // self.cell) + 1):
+                yield i, j
+
+    def insert(self, item, bounds):
+        for key in self._cells(bounds):
+            self.cells.setdefault(key, []).append(item)
+
+    def query(self, bounds):
+        found = set()
+        for key in self._cells(bounds):
+            found.update(self.cells.get(key, ()))
+        return found
+
+
+def pack(footprints, bed=BED, spacing=SPACING):
+    """
+    Place les empreintes (polygones en mm) sur le plateau [0, w] x [0, h].
+    Renvoie pour chacune la translation (dx, dy), ou None si elle ne tient pas.
+    Les plus grandes empreintes sont placées en premier.
+    """
+    width, height = bed
+    grid = GridIndex(max(CELL, spacing))
+    placed = []  # (empreinte dilatée de spacing, préparée), par ordre de pose
+    candidates = {(0.0, 0.0)}
+    moves = [None] * len(footprints)
+
+    order = sorted(range(len(footprints)), key=lambda i: -footprints[i].area)
+    for i in order:
+        fp = footprints[i]
+        xmin, ymin, xmax, ymax = fp.bounds
+        w, h = xmax - xmin, ymax - ymin
+        for x, y in sorted(candidates, key=lambda c: (c[1], c[0])):
+            if x + w > width + EPS or y + h > height + EPS:
+                continue
+            box = (x, y, x + w, y + h)
+            moved = affinity.translate(fp, x - xmin, y - ymin)
+            if any(placed[j].intersects(moved) for j in grid.query(box)):
+                continue
+            moves[i] = (x - xmin, y - ymin)
+            grid.insert(len(placed), (x - spacing, y - spacing, x + w + spacing, y + h + spacing))
+            # dilatée d'un peu moins que spacing : un bord droit posé à spacing
+            # pile touche sans chevaucher, quel que soit l'arrondi
+            placed.append(prep(moved.buffer(spacing - EPS)))
+            candidates.discard((x, y))
+            candidates.update({(x + w + spacing, y), (x, y + h + spacing)})
+            break
+    return moves
+
+
+class Cutter:
+    """Maillage et empreinte d'un emporte-pièce, prêts à être placés."""
+
+    def __init__(self, name, vertices, faces, footprint, timings):
+        self.name = name
+        self.vertices = vertices
+        self.faces = faces
+        self.footprint = footprint
+        self.timings = timings
+
+    def __str__(self):
+        return self.name
+
+
+def build_cutter(svg_path, params=svg2stl.DEFAULT_PARAMS):
+    timer = StageTimer()
+    rings = svg2stl.load_beziers(svg_path, params)
+    timer.lap("parse")
+    base = svg2stl.outline_mm(rings, params)
+    timer.lap("sample")
+    buffers = svg2stl.offset_outlines(base, params["offsets"])
+    mesh = svg2stl.cutter_mesh(base, params, timer, buffers)
+    # empreinte au sol : le contour le plus dilaté
+    footprint = buffers[max(range(len(buffers)), key=lambda i: params["offsets"][i])]
+    return Cutter(svg_path.stem, mesh.vertices, mesh.faces, footprint, timer.timings)
+
+
+def write_plate(out_path, cutters, moves):
+    """Écrit les emporte-pièces placés dans un seul STL (en flux)."""
+    with StlWriter(out_path) as writer:
+        for cutter, move in zip(cutters, moves):
+            if move is not None:
+                writer.add(cutter.vertices, cutter.faces, offset=(move[0], move[1], 0.0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SVG -> plateau d'emporte-pièces (un seul STL)")
+    parser.add_argument("svgs", nargs="*", type=Path, help=f"SVG à traiter (défaut : {SVG_IN_DIR}/*.svg)")
+    parser.add_argument("--bed", type=float, nargs=2, default=BED, metavar=("W", "H"), help="taille du plateau, mm")
+    parser.add_argument("--spacing", type=float, default=SPACING, help="écart entre emporte-pièces, mm")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="nombre de processus en parallèle")
+    parser.add_argument("--out", type=Path, default=STL_OUT_DIR / "plate.stl", help="STL du plateau")
+    args = parser.parse_args(argv)
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    svgs = args.svgs or sorted(SVG_IN_DIR.glob("*.svg"))
+    start = time.perf_counter()
+    reports = run_batch(build_cutter, svgs, svg2stl.DEFAULT_PARAMS, args.jobs)
+    cutters = [r["result"] for r in reports if r["status"] == "ok"]
+
+    t = time.perf_counter()
+    moves = pack([c.footprint for c in cutters], args.bed, args.spacing)
+    print(f"🧩 {sum(m is not None for m in moves)}/{len(cutters)} placés en {time.perf_counter() - t:.2f} s")
+    left = [c.name for c, m in zip(cutters, moves) if m is None]
+    if left:
+        print(f"⚠️ Hors plateau : {', '.join(left)}")
+
+    write_plate(args.out, cutters, moves)
+    print(f"✅ STL : {args.out}")
+    print_summary(reports, time.perf_counter() - start)
+    return 0 if all(r["status"] != "error" for r in reports) and not left else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
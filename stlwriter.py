@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Écriture STL binaire en flux.
+
+Les triangles sont écrits par blocs de taille fixe dans un tampon NumPy
+structuré (normale, 3 sommets, attribut) réutilisé d'un bloc à l'autre :
+la mémoire reste bornée quelle que soit la taille du plateau, et les
+normales sont calculées en bloc. Le nombre de triangles de l'en-tête est
+écrit à la fermeture, on peut donc ajouter plusieurs maillages à la suite.
+"""
+
+import struct
+import numpy as np
+
+STL_DTYPE = np.dtype([
+    ("normal", "<f4", (3,)),
+    ("vertices", "<f4", (3, 3)),
+    ("attr", "<u2"),
+])
+CHUNK = 1 << 16  # triangles par bloc
+
+
+class StlWriter:
+    def __init__(self, path, header=b"EmportePiece", chunk=CHUNK):
+        self.file = open(path, "wb")
+        self.file.write(header[:80].ljust(80, b"\0"))
+        self.file.write(struct.pack("<I", 0))
+        self.count = 0
+        self.buffer = np.zeros(chunk, dtype=STL_DTYPE)
+
+    def add(self, vertices, faces, offset=None):
+        """Ajoute un maillage (vertices (V, 3), faces (F, 3)), translaté de offset."""
+        vertices = np.asarray(vertices, dtype=float)
+        faces = np.asarray(faces)
+        chunk = len(self.buffer)
+        for start in range(0, len(faces), chunk):
+            tri = vertices[faces[start:start + chunk]]
+            if offset is not None:
+                tri += offset
+            normal = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+            norm = np.linalg.norm(normal, axis=1, keepdims=True)
+            np.divide(normal, norm, out=normal, where=norm > 0)
+
+            buf = self.buffer[:len(tri)]
+            buf["normal"] = normal
+            buf["vertices"] = tri
+            self.file.write(buf.tobytes())
+            self.count += len(tri)
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.file.seek(80)
+        self.file.write(struct.pack("<I", self.count))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_stl(path, vertices, faces):
+    """Écrit un maillage en STL binaire."""
+    with StlWriter(path) as writer:
+        writer.add(vertices, faces)
@@ -1,62 +1,223 @@
 #!/usr/bin/env python3
 # coding: utf-8
 
+import argparse
+import sys
+import time
+from pathlib import Path
 import numpy as np
 import svgwrite
-from svgpathtools import svg2paths
-from shapely.geometry import Polygon
+from svgpathtools import svg2paths, Line, QuadraticBezier, CubicBezier
+import shapely
+from shapely.geometry import Polygon, MultiPolygon
 import trimesh
-from config import SVG_IN_DIR, DEBUG_DIR, STL_OUT_DIR
+import bezier
+import mesher
+import tracing
+from stlwriter import write_stl
+from config import SVG_IN_DIR, DEBUG_DIR, STL_OUT_DIR, MANIFEST_PATH
+from buildcache import BuildCache
+from batch import StageTimer, run_batch, print_summary
 
 # DPI = 96
 # PX_PER_MM = DPI / 25.4
 OFF1, OFF3, OFF5 = 1.0, 3.2, 5.6  # mm
+H1, H3, H5 = 16.8, 6.0, 3.8  # hauteurs des anneaux, mm
+SIZE_MM = 42.0  # plus grande dimension du contour
+SAMPLE_TOL_MM = 0.02  # écart corde / courbe max de l'échantillonnage
 
-DEBUG_DIR.mkdir(parents=True, exist_ok=True)
-STL_OUT_DIR.mkdir(parents=True, exist_ok=True)
-
-for svg_file in SVG_IN_DIR.glob("*.svg"):
-    print(f"➡️ {svg_file.name}")
-
-    paths, _ = svg2paths(str(svg_file))
-    if len(paths) != 1:
-        print(f"⚠️ {svg_file.name}: attend 1 seul path, trouvé {len(paths)}")
-        continue
-    path = paths[0]
-
-    # Path -> polygone fermé (échantillonnage fin)
-    pts = [path.point(t) for t in np.linspace(0, 1, 600)]
-    # Ajustement à 42mm max
-    xmin = min(p.real for p in pts)
-    xmax = max(p.real for p in pts)
-    ymin = min(p.imag for p in pts)
-    ymax = max(p.imag for p in pts)
+DEFAULT_PARAMS = {
+    "offsets": (OFF1, OFF3, OFF5),
+    "heights": (H1, H3, H5),
+    "size_mm": SIZE_MM,
+    "sample_tol_mm": SAMPLE_TOL_MM,
+}
+
+
+def extrude(geom, h, z=0.0):
+    meshes = []
+    geoms = [geom] if isinstance(geom, Polygon) else list(geom.geoms)
+    for poly in geoms:
+        if poly.is_empty:
+            continue
+        try:
+            m = trimesh.creation.extrude_polygon(poly, h)
+        except Exception:
+            m = trimesh.creation.extrude_polygon(poly.buffer(0), h)
+        m.apply_translation((0, 0, z))
+        meshes.append(m)
+    return trimesh.util.concatenate(meshes) if meshes else None
+
+
+def path_to_beziers(path, tol):
+    """
+    Segments svgpathtools -> tableau (N, 4, 2) de Bézier cubiques (px).
+    Lignes et quadratiques sont converties exactement, les arcs sont
+    découpés en lignes avec un écart corde / arc <= tol.
+    """
+    ctrl = []
+    for seg in path:
+        if isinstance(seg, CubicBezier):
+            ctrl.append([seg.start, seg.control1, seg.control2, seg.end])
+        elif isinstance(seg, QuadraticBezier):
+            ctrl.append([seg.start, seg.start + 2 / 3 * (seg.control - seg.start),
+                         seg.end + 2 / 3 * (seg.control - seg.end), seg.end])
+        elif isinstance(seg, Line):
+            if abs(seg.end - seg.start) < 1e-6:
+                continue  # fermeture Z d'un contour déjà fermé (à l'arrondi près)
+            ctrl.append([seg.start, (2 * seg.start + seg.end) / 3, (seg.start + 2 * seg.end) / 3, seg.end])
+        else:  # Arc
+            r = max(seg.radius.real, seg.radius.imag)
+            step = 2 * np.arccos(max(1 - tol / r, -1.0)) if r > 0 else np.pi
+            n = max(1, int(np.ceil(np.radians(abs(seg.delta)) / step)))
+            pts = [seg.point(t) for t in np.linspace(0, 1, n + 1)]
+            ctrl += [[a, (2 * a + b) / 3, (a + 2 * b) / 3, b] for a, b in zip(pts[:-1], pts[1:])]
+    ctrl = np.array(ctrl, dtype=complex)
+    return np.stack((ctrl.real, ctrl.imag), axis=-1)
+
+
+def svg_to_stl(svg_path, out_path, params=DEFAULT_PARAMS):
+    """SVG -> STL de l'emporte-pièce, renvoie les temps par étape."""
+    timer = StageTimer()
+    rings = load_beziers(svg_path, params)
+    timer.lap("parse")
+    tracing.count("bezier_segments", sum(len(r) for r in rings))
+
+    return beziers_to_stl(rings, out_path, params, timer)
+
+
+def load_beziers(svg_path, params=DEFAULT_PARAMS):
+    """
+    SVG -> anneaux de Bézier cubiques (N, 4, 2) en px : un par sous-chemin
+    continu de chaque path (contours et trous, voir outline_mm).
+    """
+    paths, _ = svg2paths(str(svg_path))
+    subpaths = [sub for path in paths for sub in path.continuous_subpaths() if len(sub)]
+    if not subpaths:
+        raise ValueError(f"{svg_path.name}: aucun path")
+    boxes = np.array([sub.bbox() for sub in subpaths])
+    xmin, xmax = boxes[:, 0].min(), boxes[:, 1].max()
+    ymin, ymax = boxes[:, 2].min(), boxes[:, 3].max()
+    tol_px = params["sample_tol_mm"] * max(xmax - xmin, ymax - ymin) / params["size_mm"]
+    return [path_to_beziers(sub, tol_px) for sub in subpaths]
+
+
+def beziers_to_stl(rings, out_path, params=DEFAULT_PARAMS, timer=None):
+    """Anneaux de Bézier cubiques (N, 4, 2) en px -> STL, renvoie les temps par étape."""
+    timer = timer or StageTimer()
+    base = outline_mm(rings, params)
+    timer.lap("sample")
+
+    mesh = cutter_mesh(base, params, timer)
+    tracing.count("mesh_triangles", len(mesh.faces))
+    write_stl(out_path, mesh.vertices, mesh.faces)
+    timer.lap("export")
+    return timer.timings
+
+
+def outline_mm(rings, params=DEFAULT_PARAMS):
+    """
+    Anneaux de Bézier (N, 4, 2) en px -> polygone en mm (MultiPolygon si
+    plusieurs pièces), plus grande dimension de l'ensemble = size_mm.
+    """
+    # Ajustement à 42mm max
+    xmin, xmax, ymin, ymax = bezier.bbox(np.concatenate(rings))
     max_dim_px = max(xmax - xmin, ymax - ymin)
-    scale = 42.0 / max_dim_px
+    scale = params["size_mm"] / max_dim_px
+
+    # Bézier -> polygones fermés, échantillonnage adaptatif (tolérance en mm)
+    polys = []
+    for ctrl in rings:
+        pts = bezier.flatten(ctrl, params["sample_tol_mm"] / scale)
+        if np.allclose(pts[0], pts[-1], rtol=0, atol=1e-6):
+            pts = pts[:-1]  # fermeture à l'arrondi près (path relatif) : shapely referme exactement
+        polys.append(Polygon(pts * (scale, -scale)))  # maintenant en millimètres (fermé par shapely)
+    base = nest_rings(polys)
 
-    coords_mm = [(p.real * scale, -p.imag * scale) for p in pts]
-    if coords_mm[0] != coords_mm[-1]:
-        coords_mm.append(coords_mm[0])
-    base = Polygon(coords_mm)  # maintenant en millimètres
- 
     if base.is_empty:
-        print("⚠️ Contour vide.")
-        continue
+        raise ValueError("Contour vide.")
 
     if not base.is_valid:
-        print("⚠️ Contour invalide.")
-        continue
+        raise ValueError("Contour invalide.")
+    return base
+
+
+def nest_rings(polys):
+    """
+    Anneaux (polygones simples) -> Polygon / MultiPolygon, en pair-impair :
+    le parent d'un anneau est le plus petit anneau qui le contient ; à
+    profondeur paire c'est un extérieur, à profondeur impaire un trou de
+    son parent (une pièce dans un trou redevient un extérieur).
+    """
+    if len(polys) == 1:
+        return polys[0]
+    polys = sorted(polys, key=lambda p: p.area, reverse=True)
+    depth, holes, shells = [], {}, []
+    for i, poly in enumerate(polys):
+        point = poly.representative_point()
+        parent = next((j for j in range(i - 1, -1, -1) if polys[j].contains(point)), None)
+        depth.append(0 if parent is None else depth[parent] + 1)
+        if depth[i] % 2:
+            holes[parent].append(poly.exterior.coords)
+        else:
+            holes[i] = []
+            shells.append(i)
+    parts = [Polygon(polys[i].exterior.coords, holes[i]) for i in shells]
+    return parts[0] if len(parts) == 1 else MultiPolygon(parts)
 
 
-    # Offsets
-    b1 = base.buffer(OFF1)
-    b3 = base.buffer(OFF3)
-    b5 = base.buffer(OFF5)
+def offset_outlines(base, offsets):
+    """
+    Dilatations de base pour chaque offset (mm), dans l'ordre des offsets.
+    Chaque contour est dilaté depuis le précédent, du plus petit au plus
+    grand offset : en coins ronds buffer(a).buffer(b) == buffer(a + b).
+    """
+    outlines = [None] * len(offsets)
+    prev, prev_off = base, 0.0
+    for i in np.argsort(offsets, kind="stable"):
+        prev = prev.buffer(offsets[i] - prev_off) if offsets[i] != prev_off else prev
+        prev_off = offsets[i]
+        outlines[i] = prev
+    return outlines
+
+
+def offset_rings(base, outlines):
+    """
+    Anneaux 2D (contour dilaté - base). Quand base et contour sont des
+    polygones simples, la base est strictement à l'intérieur : l'anneau est
+    construit directement avec la base comme trou, sans booléen.
+    """
+    simple = isinstance(base, Polygon) and not base.interiors
+    rings = []
+    for outline in outlines:
+        if simple and isinstance(outline, Polygon) and not outline.interiors and outline is not base:
+            rings.append(Polygon(outline.exterior.coords, [base.exterior.coords]))
+        else:
+            rings.append(outline.difference(base))
+    return rings
+
+
+def cutter_mesh(base, params=DEFAULT_PARAMS, timer=None, buffers=None):
+    """
+    Contour (mm) -> maillage de l'emporte-pièce. Paroi en escalier maillée
+    directement (mesher.stepped_wall) quand les hauteurs décroissent avec
+    l'offset, sinon anneaux extrudés puis concaténés. buffers : contours
+    dilatés déjà calculés (offset_outlines), sinon calculés ici.
+    """
+    timer = timer or StageTimer()
+
+    # Offsets (autant que de hauteurs)
+    if len(params["offsets"]) != len(params["heights"]):
+        raise ValueError("offsets et heights doivent avoir la même longueur")
+    if buffers is None:
+        buffers = offset_outlines(base, params["offsets"])
+    timer.lap("buffer")
+    tracing.count("polygon_vertices", int(shapely.get_num_coordinates([base, *buffers]).sum()))
 
     # --- SVG debug (path noir + 3 dilatations rouge/orange/vert)
-    # debug_svg = DEBUG_DIR / f"{svg_file.stem}_debug.svg"
+    # debug_svg = DEBUG_DIR / "debug.svg"
     # dwg = svgwrite.Drawing(str(debug_svg))
-    # for g, color in [(base, "black"), (b1, "red"), (b3, "orange"), (b5, "green")]:
+    # for g, color in [(base, "black")] + list(zip(buffers, ["red", "orange", "green"])):
     #     geoms = [g] if isinstance(g, Polygon) else list(g.geoms)
     #     for poly in geoms:
     #         x, y = poly.exterior.xy
@@ -64,36 +225,64 @@ for svg_file in SVG_IN_DIR.glob("*.svg"):
     # dwg.save()
     # print(f"🧩 SVG debug : {debug_svg}")
 
-    # --- Extrusions -> STL (un seul solide)
-    def extrude(geom, h, z=0.0):
-        meshes = []
-        geoms = [geom] if isinstance(geom, Polygon) else list(geom.geoms)
-        for poly in geoms:
-            if poly.is_empty:
-                continue
-            try:
-                m = trimesh.creation.extrude_polygon(poly, h)
-            except Exception:
-                m = trimesh.creation.extrude_polygon(poly.buffer(0), h)
-            m.apply_translation((0, 0, z))
-            meshes.append(m)
-        return trimesh.util.concatenate(meshes) if meshes else None
-
-    # Anneaux 2D non chevauchants
-    ring5 = b5.difference(base)   # 5mm - 3mm
-    ring3 = b3.difference(base)   # 3mm - 1mm
-    ring1 = b1.difference(base) # 1mm - base (cavité)
-
-    m5 = extrude(ring5, -3.8, z=0.0)  # 0→3.8 mm
-    m3 = extrude(ring3, -6, z=0.0)  # 0→6 mm
-    m1 = extrude(ring1, -16.8, z=0) # 0→16.8 mm
-
-    parts = [m for m in (m5, m3, m1) if m is not None]
+    # --- Paroi en escalier : un seul solide étanche, 0 -> -h mm
+    order = np.argsort(params["offsets"], kind="stable")
+    offsets = np.asarray(params["offsets"], dtype=float)[order]
+    heights = np.asarray(params["heights"], dtype=float)[order]
+    if offsets[0] > 0 and (np.diff(offsets) > 0).all() and heights[-1] > 0 and (np.diff(heights) < 0).all():
+        try:
+            vertices, faces = mesher.stepped_wall(base, [buffers[i] for i in order], heights)
+            mesh = trimesh.Trimesh(vertices, faces, process=False)
+            timer.lap("extrude")
+            return mesh
+        except ValueError:
+            tracing.count("mesh_fallback")  # triangulation impossible : extrusion classique
+
+    # Anneaux 2D (offset - base)
+    rings = offset_rings(base, buffers)
+    timer.lap("boolean")
+
+    # --- Extrusions -> un seul solide, 0 -> -h mm
+    parts = [extrude(ring, -h, z=0.0) for ring, h in zip(rings, params["heights"])]
+    parts = [m for m in parts if m is not None]
     if not parts:
-        print("⚠️ Rien à extruder.")
-        continue
+        raise ValueError("Rien à extruder.")
 
     mesh = trimesh.util.concatenate(parts)
-    out = STL_OUT_DIR / f"{svg_file.stem}.stl"
-    mesh.export(out)
-    print(f"✅ STL : {out}")
+    timer.lap("extrude")
+    return mesh
+
+
+def stl_path_for(svg_path):
+    return STL_OUT_DIR / f"{svg_path.stem}.stl"
+
+
+def process_svg(svg_path, params=DEFAULT_PARAMS):
+    return svg_to_stl(svg_path, stl_path_for(svg_path), params)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SVG -> STL d'emporte-pièce")
+    parser.add_argument("svgs", nargs="*", type=Path, help=f"SVG à traiter (défaut : {SVG_IN_DIR}/*.svg)")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="nombre de processus en parallèle")
+    parser.add_argument("--force", action="store_true", help="reconstruit tout sans tenir compte du cache")
+    parser.add_argument("--summary", type=Path, help="écrit le bilan du lot en JSON")
+    parser.add_argument("--trace", type=Path, help="trace JSON lines (étapes, compteurs) par SVG")
+    parser.add_argument("--profile", type=Path, help="dossier des profils cProfile par SVG")
+    args = parser.parse_args(argv)
+
+    DEBUG_DIR.mkdir(parents=True, exist_ok=True)
+    STL_OUT_DIR.mkdir(parents=True, exist_ok=True)
+    if args.profile:
+        args.profile.mkdir(parents=True, exist_ok=True)
+
+    svgs = args.svgs or sorted(SVG_IN_DIR.glob("*.svg"))
+    start = time.perf_counter()
+    cache = BuildCache(MANIFEST_PATH, "svg2stl", force=args.force)
+    reports = run_batch(process_svg, svgs, DEFAULT_PARAMS, args.jobs, cache, stl_path_for, args.trace, args.profile)
+    print_summary(reports, time.perf_counter() - start, args.summary)
+    return 0 if all(r["status"] != "error" for r in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
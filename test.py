@@ -3,6 +3,7 @@ import cv2
 import trimesh
 from shapely.geometry import Polygon, MultiPolygon
 import numpy as np
+from stlwriter import write_stl
 
 BORDER = 15
 TEXT = "F8"
@@ -65,4 +66,4 @@ mesh = extrude(rect,3.0, z=3.0)
 
 # mesh = trimesh.util.concatenate(parts)
 # # mesh = trimesh.creation.extrude_polygon(frame, height=3.0)
-mesh.export("word_plate.stl")
+write_stl("word_plate.stl", mesh.vertices, mesh.faces)
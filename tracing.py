@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Instrumentation légère : chronos par étape, compteurs et profil cProfile
+optionnel, collectés pour un fichier à la fois puis écrits en JSON lines.
+
+Les modules appellent stage(), count(), peak() et detail() sans se soucier
+d'une trace active : hors de traced(...) ce sont des no-op, le coût est
+celui d'un appel de fonction. Exemple de ligne écrite :
+
+    {"name": "chat.png", "status": "ok", "seconds": 41.2,
+     "stages": {"segmentation": 0.3, "contour": 0.1, "fitCurve": 40.6},
+     "counters": {"contour_points": 5120, "fit_spans": 9312, "fit_depth": 41},
+     "details": {"contours": [{"points": 5120, "segments": 96, "spans": 9312, "iterations": 2210}]},
+     "profile": ".../trace-chat.prof"}
+"""
+
+import cProfile
+import json
+import time
+from contextlib import contextmanager
+
+_active = None  # Trace en cours dans ce processus
+
+
+class Trace:
+    """Temps par étape (cumulés) et compteurs d'un traitement."""
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = {}
+        self.counters = {}
+        self.details = {}
+        self.profile = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def peak(self, name, value):
+        self.counters[name] = max(self.counters.get(name, value), value)
+
+    def detail(self, name, value):
+        self.details.setdefault(name, []).append(value)
+
+    def record(self):
+        return {"name": self.name, "stages": self.stages, "counters": self.counters, "details": self.details,
+                "profile": self.profile}
+
+
+@contextmanager
+def traced(name, profile_path=None):
+    """Active une Trace pour le bloc ; profile_path : profil cProfile écrit à la fin."""
+    global _active
+    previous, _active = _active, Trace(name)
+    profiler = cProfile.Profile() if profile_path else None
+    try:
+        if profiler:
+            profiler.enable()
+        yield _active
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            _active.profile = str(profile_path)
+        _active = previous
+
+
+@contextmanager
+def stage(name):
+    """Chrono d'étape sur la trace active (rien sinon)."""
+    if _active is None:
+        yield
+    else:
+        with _active.stage(name):
+            yield
+
+
+def count(name, n=1):
+    if _active is not None:
+        _active.count(name, n)
+
+
+def peak(name, value):
+    if _active is not None:
+        _active.peak(name, value)
+
+
+def detail(name, value):
+    """Ajoute value à la liste name de la trace active (ex. un dict par contour)."""
+    if _active is not None:
+        _active.detail(name, value)
+
+
+def write_traces(path, records):
+    """Ajoute les enregistrements au fichier JSON lines path."""
+    with open(path, "a") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")